@@ -0,0 +1,42 @@
+import json
+import sys
+
+import tictactoe as ttt
+
+
+def opening_positions():
+    """
+    Returns the empty board and every board after X's first move.
+    """
+    positions = [ttt.initial_state()]
+    for i in range(3):
+        for j in range(3):
+            positions.append(ttt.result(ttt.initial_state(), (i, j)))
+    return positions
+
+
+def main():
+    if len(sys.argv) > 2:
+        sys.exit("Usage: python benchmark.py [results.json]")
+
+    # Measure live search, not table lookups
+    ttt.unload_table()
+
+    results = []
+    for board in opening_positions():
+        action, stats = ttt.minimax_with_stats(board)
+        moves = [(i, j) for i in range(3) for j in range(3) if board[i][j] != ttt.EMPTY]
+        print(f"{str(moves):8} -> {action}: {stats}")
+        results.append(dict(moves=moves, **stats.as_dict()))
+
+    nodes = sum(result["nodes"] for result in results)
+    elapsed = sum(result["elapsed"] for result in results)
+    print(f"Total: {nodes} nodes in {elapsed:.3f}s, {nodes / elapsed:.0f} nodes/s")
+
+    if len(sys.argv) == 2:
+        with open(sys.argv[1], "w") as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,414 @@
+"""
+N x N k-in-a-row player (tic-tac-toe, 5 x 5 four-in-a-row, gomoku)
+"""
+
+import math
+import sys
+import time
+
+X = "X"
+O = "O"
+EMPTY = None
+
+# Score of a won position; wins found closer to the root score higher.
+WIN = 10 ** 9
+
+
+class Game():
+    """
+    N x N board where the first player to get k in a row wins.
+
+    States are (x, o) bitboards. Each row is padded with one column that
+    is always empty, so shifting a mask never carries a line from the end
+    of one row onto the start of the next.
+    """
+
+    def __init__(self, n=3, k=None, radius=None):
+
+        # radius limits the search to empty cells within that many
+        # steps of a stone; big boards are hopeless without it
+        self.n = n
+        self.k = n if k is None else k
+        if not 1 <= self.k <= n:
+            raise ValueError(f"cannot get {self.k} in a row on a {n} x {n} board")
+        self.radius = radius if radius is not None or n <= 5 else 1
+        self.width = n + 1
+        self.directions = (1, self.width, self.width + 1, self.width - 1)
+
+        cells = [self.cell(i, j) for i in range(n) for j in range(n)]
+        self.full = sum(1 << cell for cell in cells)
+
+        # Every k-long line on the board, used by the static evaluation
+        self.windows = []
+        for cell in cells:
+            i, j = self.coordinates(cell)
+            for di, dj in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                end_i, end_j = i + di * (self.k - 1), j + dj * (self.k - 1)
+                if 0 <= end_i < n and 0 <= end_j < n:
+                    self.windows.append(sum(
+                        1 << self.cell(i + di * s, j + dj * s)
+                        for s in range(self.k)
+                    ))
+        self.window_scores = [0] + [10 ** (count - 1) for count in range(1, self.k + 1)]
+
+        # Moves are tried centre first
+        centre = (n - 1) / 2
+        self.rank = {}
+        for cell in sorted(cells, key=lambda c: max(abs(self.coordinates(c)[0] - centre),
+                                                    abs(self.coordinates(c)[1] - centre))):
+            self.rank[cell] = len(self.rank)
+        self.centre = min(self.rank, key=self.rank.get)
+
+    def cell(self, i, j):
+        return i * self.width + j
+
+    def coordinates(self, cell):
+        return divmod(cell, self.width)
+
+    def initial_state(self):
+        return (0, 0)
+
+    def to_state(self, board):
+        """
+        Returns the (x, o) bitboards of a list-of-lists board.
+        """
+        x = o = 0
+        for i, row in enumerate(board):
+            for j, value in enumerate(row):
+                if value == X:
+                    x |= 1 << self.cell(i, j)
+                elif value == O:
+                    o |= 1 << self.cell(i, j)
+        return x, o
+
+    def to_board(self, state):
+        """
+        Returns the list-of-lists board of the (x, o) bitboards.
+        """
+        x, o = state
+        board = []
+        for i in range(self.n):
+            row = []
+            for j in range(self.n):
+                bit = 1 << self.cell(i, j)
+                row.append(X if x & bit else O if o & bit else EMPTY)
+            board.append(row)
+        return board
+
+    def print(self, state):
+        """
+        Prints a text-based representation of the board.
+        """
+        for row in self.to_board(state):
+            print(" ".join(value or "." for value in row))
+
+    def player(self, state):
+        """
+        Returns the player who has the next turn.
+        """
+        x, o = state
+        return X if x.bit_count() <= o.bit_count() else O
+
+    def actions(self, state):
+        """
+        Returns the list of empty cells.
+        """
+        x, o = state
+        return self.cells(self.full & ~(x | o))
+
+    def result(self, state, action):
+        """
+        Returns the state after the player to move takes cell action.
+        """
+        x, o = state
+        bit = 1 << action
+        if (x | o) & bit:
+            raise Exception("The action is not vaild for the board.")
+        if x.bit_count() <= o.bit_count():
+            return x | bit, o
+        return x, o | bit
+
+    def winner(self, state):
+        x, o = state
+        if self.has_line(x):
+            return X
+        if self.has_line(o):
+            return O
+        return None
+
+    def terminal(self, state):
+        x, o = state
+        return (x | o) == self.full or self.has_line(x) or self.has_line(o)
+
+    def utility(self, state):
+        """
+        Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
+        """
+        x, o = state
+        if self.has_line(x):
+            return 1
+        if self.has_line(o):
+            return -1
+        return 0
+
+    def playout(self, state, rng):
+        """
+        Plays uniformly random moves until the game ends and
+        returns its utility.
+        """
+        x, o = state
+        if self.terminal(state):
+            return self.utility(state)
+        cells = self.actions(state)
+        rng.shuffle(cells)
+        x_turn = x.bit_count() <= o.bit_count()
+        for cell in cells:
+            if x_turn:
+                x |= 1 << cell
+                if self.has_line(x):
+                    return 1
+            else:
+                o |= 1 << cell
+                if self.has_line(o):
+                    return -1
+            x_turn = not x_turn
+        return 0
+
+    def has_line(self, mask):
+        """
+        Returns True if mask contains k cells in a row.
+        """
+        for direction in self.directions:
+            line = mask
+            for step in range(1, self.k):
+                line &= mask >> (step * direction)
+                if not line:
+                    break
+            if line:
+                return True
+        return False
+
+    def cells(self, mask):
+        """
+        Returns the cells in mask, centre first.
+        """
+        cells = []
+        while mask:
+            low = mask & -mask
+            cells.append(low.bit_length() - 1)
+            mask ^= low
+        cells.sort(key=self.rank.__getitem__)
+        return cells
+
+    def candidates(self, occupied):
+        """
+        Returns the empty cells worth searching, centre first.
+        """
+        if not occupied:
+            return [self.centre]
+        if self.radius is None:
+            return self.cells(self.full & ~occupied)
+        near = occupied
+        for _ in range(self.radius):
+            grown = near
+            for direction in self.directions:
+                grown |= near << direction | near >> direction
+            near = grown & self.full
+        return self.cells(near & ~occupied)
+
+    def evaluate(self, me, opponent):
+        """
+        Static evaluation for the player owning me: every line that is
+        still open for only one side scores 10 ** (stones - 1) for it.
+        """
+        score = 0
+        scores = self.window_scores
+        for window in self.windows:
+            mine = me & window
+            theirs = opponent & window
+            if mine:
+                if not theirs:
+                    score += scores[mine.bit_count()]
+            elif theirs:
+                score -= scores[theirs.bit_count()]
+        return score
+
+
+class SearchStats():
+    """
+    Statistics of one best_move call
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self.nodes = 0
+        self.cutoffs = 0
+        self.elapsed = 0.0
+        self.value = None
+
+    def nodes_per_second(self):
+        return self.nodes / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self):
+        return (f"depth {self.depth}, {self.nodes} nodes, {self.cutoffs} cutoffs, "
+                f"{self.nodes_per_second():.0f} nodes/s, value {self.value}")
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class Search():
+    """
+    Iterative deepening negamax with alpha-beta pruning and a
+    transposition table, stopping at a wall clock deadline.
+    """
+
+    # Nodes searched between two looks at the clock
+    CLOCK_INTERVAL = 1024
+
+    def __init__(self, game, time_limit=None, max_depth=None):
+        self.game = game
+        self.time_limit = time_limit
+        self.max_depth = max_depth
+        self.table = {}
+        self.stats = SearchStats()
+        self.deadline = None
+
+    def best_move(self, state):
+        """
+        Returns (action, stats) for the player to move in state. When the
+        time limit runs out the best move of the deepest search so far is
+        returned, including root moves already searched at the next depth.
+        """
+        game = self.game
+        start = time.perf_counter()
+        self.stats = SearchStats()
+        if self.time_limit is not None:
+            self.deadline = start + self.time_limit
+
+        if game.terminal(state):
+            return None, self.stats
+        x, o = state
+        me, opponent = (x, o) if game.player(state) == X else (o, x)
+        moves = game.candidates(me | opponent)
+        best = moves[0]
+        empty = (game.full & ~(me | opponent)).bit_count()
+        max_depth = empty if self.max_depth is None else min(self.max_depth, empty)
+
+        for depth in range(1, max_depth + 1):
+            self.root_best = None
+            try:
+                value = self.negamax(me, opponent, depth, -math.inf, math.inf, 0,
+                                     root_moves=[best] + [m for m in moves if m != best])
+            except SearchTimeout:
+                if self.root_best is not None:
+                    best = self.root_best
+                break
+            best = self.root_best
+            self.stats.depth = depth
+            self.stats.value = value
+
+            # Nothing left to learn once the game is decided
+            if abs(value) > WIN - 1000:
+                break
+
+        self.stats.elapsed = time.perf_counter() - start
+        return best, self.stats
+
+    def negamax(self, me, opponent, depth, alpha, beta, ply, root_moves=None):
+        game = self.game
+        stats = self.stats
+        stats.nodes += 1
+        if (self.deadline is not None and stats.nodes % self.CLOCK_INTERVAL == 0
+                and time.perf_counter() > self.deadline):
+            raise SearchTimeout
+
+        occupied = me | opponent
+        if occupied == game.full:
+            return 0
+        if depth == 0:
+            return game.evaluate(me, opponent)
+
+        # Transposition table lookup
+        key = (me, opponent)
+        entry = self.table.get(key)
+        table_move = None
+        if entry is not None:
+            entry_depth, entry_value, entry_flag, table_move = entry
+            if entry_depth >= depth and root_moves is None:
+                if entry_flag == 0:
+                    return entry_value
+                elif entry_flag > 0:
+                    alpha = max(alpha, entry_value)
+                else:
+                    beta = min(beta, entry_value)
+                if alpha >= beta:
+                    return entry_value
+
+        if root_moves is not None:
+            moves = root_moves
+        else:
+            moves = game.candidates(occupied)
+            if table_move is not None:
+                moves.remove(table_move)
+                moves.insert(0, table_move)
+
+        alpha_start = alpha
+        best_value = -math.inf
+        best = None
+        for cell in moves:
+            placed = me | 1 << cell
+            if game.has_line(placed):
+                value = WIN - ply
+            else:
+                value = -self.negamax(opponent, placed, depth - 1, -beta, -alpha, ply + 1)
+            if value > best_value:
+                best_value, best = value, cell
+                if root_moves is not None:
+                    self.root_best = cell
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                stats.cutoffs += 1
+                break
+
+        # Exact values are flagged 0, lower bounds 1, upper bounds -1
+        if best_value <= alpha_start:
+            flag = -1
+        elif best_value >= beta:
+            flag = 1
+        else:
+            flag = 0
+        self.table[key] = (depth, best_value, flag, best)
+        return best_value
+
+
+def best_move(game, state, time_limit=1.0, max_depth=None):
+    """
+    Returns (action, stats) for the player to move, searching for at
+    most time_limit seconds (None for no limit).
+    """
+    return Search(game, time_limit, max_depth).best_move(state)
+
+
+def main():
+    if len(sys.argv) > 4:
+        sys.exit("Usage: python kinarow.py [n] [k] [seconds]")
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    k = int(sys.argv[2]) if len(sys.argv) > 2 else min(n, 4)
+    time_limit = float(sys.argv[3]) if len(sys.argv) > 3 else 1.0
+
+    # Computer plays both sides
+    game = Game(n, k)
+    state = game.initial_state()
+    while not game.terminal(state):
+        move, stats = best_move(game, state, time_limit)
+        print(f"{game.player(state)} plays {game.coordinates(move)}: {stats}")
+        state = game.result(state, move)
+    game.print(state)
+    winner = game.winner(state)
+    print("Game Over: Tie." if winner is None else f"Game Over: {winner} wins.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Monte Carlo Tree Search (UCT) player for tic-tac-toe style games
+
+A game is anything with player, actions, result, terminal and utility
+functions taking a state, like the tictactoe module or a kinarow.Game.
+If the game also has playout(state, rng), it is used for the random
+simulations instead of stepping through result one move at a time.
+"""
+
+import importlib
+import math
+import multiprocessing
+import random
+import sys
+import time
+import types
+
+X = "X"
+O = "O"
+
+
+class Node():
+    """
+    Search tree node for the state reached by playing action.
+    wins counts results from the point of view of mover, the player
+    who played action.
+    """
+
+    __slots__ = ("parent", "action", "state", "mover", "children",
+                 "untried", "visits", "wins")
+
+    def __init__(self, game, state, parent=None, action=None, mover=None):
+        self.parent = parent
+        self.action = action
+        self.state = state
+        self.mover = mover
+        self.children = []
+        self.untried = [] if game.terminal(state) else list(game.actions(state))
+        self.visits = 0
+        self.wins = 0.0
+
+    def select(self, exploration):
+        """
+        Returns the child with the highest upper confidence bound.
+        """
+        log_visits = math.log(self.visits)
+        return max(self.children, key=lambda child: (
+            child.wins / child.visits
+            + exploration * math.sqrt(log_visits / child.visits)
+        ))
+
+
+class TreeStats():
+    """
+    Root statistics of one or more merged searches
+    """
+
+    def __init__(self):
+        self.iterations = 0
+        self.elapsed = 0.0
+        self.processes = 1
+        # action -> [visits, wins]
+        self.children = {}
+
+    def merge(self, other):
+        self.iterations += other.iterations
+        for action, (visits, wins) in other.children.items():
+            child = self.children.setdefault(action, [0, 0.0])
+            child[0] += visits
+            child[1] += wins
+
+    def best_action(self):
+        """
+        Returns the most visited root action.
+        """
+        if not self.children:
+            return None
+        return max(self.children, key=lambda action: self.children[action][0])
+
+    def __str__(self):
+        rate = self.iterations / self.elapsed if self.elapsed else 0.0
+        return (f"{self.iterations} iterations on {self.processes} processes, "
+                f"{rate:.0f} iterations/s")
+
+
+def reward(mover, value):
+    """
+    Returns the result of a game with utility value for mover:
+    1 for a win, 0.5 for a tie and 0 for a loss.
+    """
+    if mover == X:
+        return (1 + value) / 2
+    return (1 - value) / 2
+
+
+def random_playout(game, state, rng):
+    """
+    Plays uniformly random moves until the game ends and returns its utility.
+    """
+    while not game.terminal(state):
+        state = game.result(state, rng.choice(list(game.actions(state))))
+    return game.utility(state)
+
+
+def search(game, state, iterations=None, time_limit=None, exploration=math.sqrt(2), seed=None):
+    """
+    Grows a UCT tree from state until either budget runs out and returns
+    its TreeStats.
+    """
+    if iterations is None and time_limit is None:
+        raise ValueError("need an iteration or time budget")
+    if isinstance(game, str):
+        game = importlib.import_module(game)
+    rng = random.Random(seed)
+    playout = getattr(game, "playout", None)
+    start = time.perf_counter()
+    deadline = None if time_limit is None else start + time_limit
+
+    root = Node(game, state)
+    count = 0
+    while ((iterations is None or count < iterations)
+           and (deadline is None or time.perf_counter() < deadline)):
+        node = root
+
+        # Selection
+        while not node.untried and node.children:
+            node = node.select(exploration)
+
+        # Expansion
+        if node.untried:
+            action = node.untried.pop(rng.randrange(len(node.untried)))
+            child = Node(game, game.result(node.state, action), node, action,
+                         game.player(node.state))
+            node.children.append(child)
+            node = child
+
+        # Simulation
+        if playout is not None:
+            value = playout(node.state, rng)
+        else:
+            value = random_playout(game, node.state, rng)
+
+        # Backpropagation
+        while node.parent is not None:
+            node.visits += 1
+            node.wins += reward(node.mover, value)
+            node = node.parent
+        node.visits += 1
+        count += 1
+
+    stats = TreeStats()
+    stats.iterations = count
+    stats.children = {child.action: [child.visits, child.wins] for child in root.children}
+    stats.elapsed = time.perf_counter() - start
+    return stats
+
+
+def _search_worker(args):
+    return search(*args)
+
+
+def best_action(game, state, iterations=None, time_limit=None, processes=1,
+                exploration=math.sqrt(2), seed=None):
+    """
+    Returns (action, stats) for the player to move in state.
+
+    With several processes each one grows its own tree from state
+    (root parallelization) with its share of the iteration budget, and
+    the root statistics are summed before picking the most visited action.
+    """
+    start = time.perf_counter()
+    if processes <= 1:
+        stats = search(game, state, iterations, time_limit, exploration, seed)
+    else:
+        # Modules cannot be pickled, workers import them again by name
+        if isinstance(game, types.ModuleType):
+            game = game.__name__
+        base = random.Random(seed).randrange(2 ** 32)
+        share = None if iterations is None else -(-iterations // processes)
+        jobs = [(game, state, share, time_limit, exploration, base + i)
+                for i in range(processes)]
+        stats = TreeStats()
+        with multiprocessing.Pool(processes) as pool:
+            for worker_stats in pool.map(_search_worker, jobs):
+                stats.merge(worker_stats)
+        stats.processes = processes
+    stats.elapsed = time.perf_counter() - start
+    return stats.best_action(), stats
+
+
+def main():
+    import kinarow
+
+    if len(sys.argv) > 5:
+        sys.exit("Usage: python mcts.py [n] [k] [seconds] [processes]")
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 7
+    k = int(sys.argv[2]) if len(sys.argv) > 2 else min(n, 4)
+    time_limit = float(sys.argv[3]) if len(sys.argv) > 3 else 1.0
+    processes = int(sys.argv[4]) if len(sys.argv) > 4 else multiprocessing.cpu_count()
+
+    # Computer plays both sides
+    game = kinarow.Game(n, k)
+    state = game.initial_state()
+    while not game.terminal(state):
+        move, stats = best_action(game, state, time_limit=time_limit, processes=processes)
+        print(f"{game.player(state)} plays {game.coordinates(move)}: {stats}")
+        state = game.result(state, move)
+    game.print(state)
+    winner = game.winner(state)
+    print("Game Over: Tie." if winner is None else f"Game Over: {winner} wins.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,17 @@
+import os
 import pygame
 import sys
+import threading
 import time
 
+from concurrent.futures import Future
+
 import tictactoe as ttt
 
+# Answer AI moves from the perfect-play table when it has been built.
+if os.path.exists(ttt.TABLE_FILE):
+    ttt.load_table()
+
 pygame.init()
 size = width, height = 600, 400
 
@@ -11,6 +19,10 @@ size = width, height = 600, 400
 black = (0, 0, 0)
 white = (255, 255, 255)
 
+# Frames drawn per second, and the least time the computer takes per move
+FPS = 30
+AI_DELAY = 0.5
+
 screen = pygame.display.set_mode(size)
 
 mediumFont = pygame.font.Font("OpenSans-Regular.ttf", 28)
@@ -19,7 +31,21 @@ moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
 
 user = None
 board = ttt.initial_state()
-ai_turn = False
+
+# The computer searches in a worker thread so the window keeps repainting.
+# ai_move is the pending search, picked up on the first frame after it is done.
+# Searches cannot be interrupted; the thread is a daemon so that quitting
+# does not wait for one to finish.
+def start_search(board):
+    future = Future()
+    threading.Thread(target=lambda: future.set_result(ttt.minimax(board)),
+                     daemon=True).start()
+    return future
+
+
+ai_move = None
+ai_started = 0
+clock = pygame.time.Clock()
 
 while True:
 
@@ -102,7 +128,8 @@ while True:
         elif user == player:
             title = f"Play as {user}"
         else:
-            title = f"Computer thinking..."
+            dots = int(time.time() * 3) % 4
+            title = "Computer thinking" + "." * dots + " " * (3 - dots)
         title = largeFont.render(title, True, white)
         titleRect = title.get_rect()
         titleRect.center = ((width / 2), 30)
@@ -110,13 +137,12 @@ while True:
 
         # Check for AI move
         if user != player and not game_over:
-            if ai_turn:
-                time.sleep(0.5)
-                move = ttt.minimax(board)
-                board = ttt.result(board, move)
-                ai_turn = False
-            else:
-                ai_turn = True
+            if ai_move is None:
+                ai_move = start_search(board)
+                ai_started = time.time()
+            elif ai_move.done() and time.time() - ai_started >= AI_DELAY:
+                board = ttt.result(board, ai_move.result())
+                ai_move = None
 
         # Check for a user move
         click, _, _ = pygame.mouse.get_pressed()
@@ -141,6 +167,6 @@ while True:
                     time.sleep(0.2)
                     user = None
                     board = ttt.initial_state()
-                    ai_turn = False
 
     pygame.display.flip()
+    clock.tick(FPS)
@@ -0,0 +1,29 @@
+import sys
+import time
+
+import tictactoe as ttt
+
+
+def main():
+    if len(sys.argv) not in [2, 3] or sys.argv[1] not in ["build", "verify"]:
+        sys.exit("Usage: python solve.py build|verify [table]")
+    path = sys.argv[2] if len(sys.argv) == 3 else ttt.TABLE_FILE
+
+    start = time.perf_counter()
+    if sys.argv[1] == "build":
+        table = ttt.build_table(path)
+        positions = sum(entry != ttt.UNREACHABLE for entry in table)
+        print(f"Solved {positions} positions into {path}", end=" ")
+    else:
+        table = ttt.load_table(path)
+        mismatches = ttt.verify_table(table)
+        for x, o in mismatches:
+            print(ttt.from_bitboard(x, o))
+        print(f"{len(mismatches)} mismatches against live search", end=" ")
+    print(f"in {time.perf_counter() - start:.2f}s")
+    if sys.argv[1] == "verify" and mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
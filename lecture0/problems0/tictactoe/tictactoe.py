@@ -2,13 +2,45 @@
 Tic Tac Toe Player
 """
 
+import json
 import math
-import copy
+import random
+import time
 
 X = "X"
 O = "O"
 EMPTY = None
 
+# Bitboards: one 9-bit mask per player, cell (i, j) lives at bit 3 * i + j.
+FULL = 0b111111111
+
+WIN_LINES = (
+    0b000000111, 0b000111000, 0b111000000,  # rows
+    0b001001001, 0b010010010, 0b100100100,  # columns
+    0b100010001, 0b001010100                # diagonals
+)
+
+# WINNING[mask] is True if the cells in mask contain a complete line.
+WINNING = [any(mask & line == line for line in WIN_LINES)
+           for mask in range(FULL + 1)]
+
+# POPCOUNT[mask] is the number of pieces in mask.
+POPCOUNT = [bin(mask).count("1") for mask in range(FULL + 1)]
+
+# Perfect-play table: one byte per position, indexed by its base-3 number.
+# The high nibble holds the minimax value + 1, the low nibble the best cell.
+TABLE_FILE = "tictactoe.table"
+TABLE_SIZE = 3 ** 9
+NO_MOVE = 0xF
+UNREACHABLE = 0xFF
+
+# TERNARY[mask] is the base-3 number with a 1 digit for every cell in mask.
+TERNARY = [sum(3 ** cell for cell in range(9) if mask >> cell & 1)
+           for mask in range(FULL + 1)]
+
+# The loaded table, None while minimax searches live.
+_table = None
+
 def initial_state():
     """
     Returns starting state of the board.
@@ -21,39 +53,19 @@ def player(board):
     """
     Returns player who has the next turn on a board.
     """
-    if terminal(board):
+    x, o = to_bitboard(board)
+    if bb_terminal(x, o):
         return None
-    else:
-        x_count = 0
-        o_count = 0
-        for i in range(len(board)):
-            for j in range(len(board[0])):
-                if board[i][j] == X:
-                    x_count += 1
-                elif board[i][j] == O:
-                    o_count += 1
-                else:
-                    pass
-        # in the initial game state, X gets the first move hence including the equal sign.
-        if x_count <= o_count:
-            return X
-        else:
-            return O
+    return bb_player(x, o)
 
 def actions(board):
     """
     Returns set of all possible actions (i, j) available on the board.
     """
-    if terminal(board):
+    x, o = to_bitboard(board)
+    if bb_terminal(x, o):
         return None
-    else:
-        possible_actions = set()
-        for i in range(len(board)):
-            for j in range(len(board[0])):
-                if board[i][j] not in [X, O]:
-                # != X and board[i][j] != O:
-                    possible_actions.add((i, j))
-        return possible_actions
+    return {divmod(cell, 3) for cell in bb_actions(x, o)}
 
 def result(board, action):
     """
@@ -63,7 +75,7 @@ def result(board, action):
     if board[action[0]][action[1]] in [X, O]:
         raise Exception("The action is not vaild for the board.")
     else:
-        new_board = copy.deepcopy(board)
+        new_board = [row[:] for row in board]
         new_board[action[0]][action[1]] = player(board)
     return new_board
 
@@ -71,98 +83,293 @@ def winner(board):
     """
     Returns the winner of the game, if there is one.
     """
-    winner_sym = None
-    primary_diag_flag = False
-    secondary_diag_flag = False
-    
-    # primary diagonal check
-    if all(element == board[0][0] for element in [board[i][i] for i in range(len(board))]) and board[0][0] is not None:
-        primary_diag_flag = True
-        winner_sym = board[0][0]
-        
-    # seceondary diagonal check
-    if all(element == board[0][len(board)-1] for element in [board[i][len(board)-1-i] for i in range(len(board))]) and board[0][len(board)-1] is not None:
-        secondary_diag_flag = True
-        winner_sym = board[0][len(board)-1]
-
-    if not (primary_diag_flag or secondary_diag_flag):
-        for i in range(len(board)):
-            #row checking
-            if all(element == board[i][0] for element in board[i]) and board[i][0] is not None:
-                # row_flag = True
-                winner_sym = board[i][0]
-                break
-            #col checking
-            if all(element == board[0][i] for element in [col[i] for col in board]) and board[0][i] is not None:
-                # col_flag = True
-                winner_sym = board[0][i]
-                break
-    return winner_sym # Not finished
+    return bb_winner(*to_bitboard(board))
 
 def terminal(board):
     """
     Returns True if game is over, False otherwise.
     """
-    if winner(board) is not None or tie(board):
-        return True
-    else:
-        return False
+    return bb_terminal(*to_bitboard(board))
 
 def utility(board):
     """
     Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
     """
-    if winner(board) == X:
-        return 1
-    elif winner(board) == O:
-        return -1
-    else:
-        return 0
+    return bb_utility(*to_bitboard(board))
 
-def minimax(board):
+def minimax(board, stats=None):
     """
     Returns the optimal action for the current player on the board.
+    If stats is a SearchStats, the work done is recorded in it.
     """
-    if terminal(board):
-        return None
-    else:
-        possible_actions = actions(board)
-        if player(board) == X: # maximizing
-            temp_dict = {action: min_value(result(board, action)) for action in possible_actions}
-            return max(temp_dict, key=temp_dict.get)
-        else: #minimizing
-            temp_dict = {action: max_value(result(board, action)) for action in possible_actions}
-            return min(temp_dict, key=temp_dict.get)
+    if stats is not None:
+        start = time.perf_counter()
+    x, o = to_bitboard(board)
+    if bb_terminal(x, o):
+        action = None
+    elif _table is not None and _table[position_index(x, o)] != UNREACHABLE:
+        action = divmod(_table[position_index(x, o)] & NO_MOVE, 3)
+        if stats is not None:
+            stats.table_hits += 1
+    # search on bitboards, only the chosen cell goes back to (i, j)
+    elif bb_player(x, o) == X: # maximizing
+        temp_dict = {cell: _min_value(*bb_result(x, o, cell), stats) for cell in bb_actions(x, o)}
+        action = divmod(max(temp_dict, key=temp_dict.get), 3)
+    else: #minimizing
+        temp_dict = {cell: _max_value(*bb_result(x, o, cell), stats) for cell in bb_actions(x, o)}
+        action = divmod(min(temp_dict, key=temp_dict.get), 3)
+    if stats is not None:
+        stats.action = action
+        stats.elapsed += time.perf_counter() - start
+    return action
+
+def minimax_with_stats(board):
+    """
+    Returns (action, stats) where stats is the SearchStats of the search.
+    """
+    stats = SearchStats()
+    return minimax(board, stats), stats
 
 ############################################### my functions below
 def tie(board):
-    draw_count = 0
-    filled_count = 0
-    for i in range(len(board)):
-        for j in range(len(board[0])):
-            if board[i][j] in [X, O]:
-                filled_count += 1
-    if filled_count == 9:
-        return True
-    else:
-        return False
+    x, o = to_bitboard(board)
+    return x | o == FULL
 
 def max_value(board):
-    # new_board = result(board, action)
-    if terminal(board):
-        return utility(board)
-    else:
-        v = -math.inf 
-        for action in actions(board):
-            v = max(v, min_value(result(board, action)))
-        return v
+    return _max_value(*to_bitboard(board))
 
 def min_value(board):
-    # new_board = result(board, action)
-    if terminal(board):
-        return utility(board)
-    else:
-        v = math.inf 
-        for action in actions(board):
-            v = min(v, max_value(result(board, action)))
-        return v
\ No newline at end of file
+    return _min_value(*to_bitboard(board))
+
+class SearchStats():
+    """
+    Work done by a minimax call
+    """
+
+    def __init__(self):
+        self.action = None
+        self.nodes = 0
+        self.cutoffs = 0
+        self.table_hits = 0
+        self.max_depth = 0
+        self.elapsed = 0.0
+
+    def as_dict(self):
+        return {
+            "action": self.action,
+            "nodes": self.nodes,
+            "cutoffs": self.cutoffs,
+            "table_hits": self.table_hits,
+            "max_depth": self.max_depth,
+            "elapsed": self.elapsed
+        }
+
+    def to_json(self):
+        return json.dumps(self.as_dict())
+
+    def __str__(self):
+        return (f"{self.nodes} nodes, {self.cutoffs} cutoffs, {self.table_hits} table hits, "
+                f"depth {self.max_depth}, {self.elapsed * 1000:.2f} ms")
+
+############################################### bitboard functions
+def to_bitboard(board):
+    """
+    Returns the (x, o) bitboards of a list-of-lists board.
+    """
+    x = o = 0
+    bit = 1
+    for row in board:
+        for cell in row:
+            if cell == X:
+                x |= bit
+            elif cell == O:
+                o |= bit
+            bit <<= 1
+    return x, o
+
+def from_bitboard(x, o):
+    """
+    Returns the list-of-lists board for the (x, o) bitboards.
+    """
+    return [[X if x >> (3 * i + j) & 1 else O if o >> (3 * i + j) & 1 else EMPTY
+             for j in range(3)]
+            for i in range(3)]
+
+def bb_player(x, o):
+    # X moves first, so X is to move whenever the counts are equal.
+    return X if POPCOUNT[x] <= POPCOUNT[o] else O
+
+def bb_actions(x, o):
+    """
+    Returns the list of empty cell indices on the bitboards.
+    """
+    empty = FULL & ~(x | o)
+    return [cell for cell in range(9) if empty >> cell & 1]
+
+def bb_result(x, o, cell):
+    """
+    Returns the bitboards after the player to move takes cell.
+    """
+    if POPCOUNT[x] <= POPCOUNT[o]:
+        return x | 1 << cell, o
+    return x, o | 1 << cell
+
+def bb_winner(x, o):
+    if WINNING[x]:
+        return X
+    if WINNING[o]:
+        return O
+    return None
+
+def bb_terminal(x, o):
+    return WINNING[x] or WINNING[o] or x | o == FULL
+
+def bb_utility(x, o):
+    if WINNING[x]:
+        return 1
+    if WINNING[o]:
+        return -1
+    return 0
+
+def _max_value(x, o, stats=None, depth=1):
+    if stats is not None:
+        stats.nodes += 1
+        stats.max_depth = max(stats.max_depth, depth)
+    if bb_terminal(x, o):
+        return bb_utility(x, o)
+    v = -math.inf
+    empty = FULL & ~(x | o)
+    for cell in range(9):
+        if empty >> cell & 1:
+            v = max(v, _min_value(x | 1 << cell, o, stats, depth + 1))
+            if v == 1: # nothing beats a win, skip the other moves
+                if stats is not None:
+                    stats.cutoffs += 1
+                break
+    return v
+
+def _min_value(x, o, stats=None, depth=1):
+    if stats is not None:
+        stats.nodes += 1
+        stats.max_depth = max(stats.max_depth, depth)
+    if bb_terminal(x, o):
+        return bb_utility(x, o)
+    v = math.inf
+    empty = FULL & ~(x | o)
+    for cell in range(9):
+        if empty >> cell & 1:
+            v = min(v, _max_value(x, o | 1 << cell, stats, depth + 1))
+            if v == -1:
+                if stats is not None:
+                    stats.cutoffs += 1
+                break
+    return v
+
+def playout(board, rng=random):
+    """
+    Plays uniformly random moves until the game ends and returns its utility.
+    """
+    x, o = to_bitboard(board)
+    if bb_terminal(x, o):
+        return bb_utility(x, o)
+    cells = bb_actions(x, o)
+    rng.shuffle(cells)
+    x_turn = POPCOUNT[x] <= POPCOUNT[o]
+    for cell in cells:
+        if x_turn:
+            x |= 1 << cell
+            if WINNING[x]:
+                return 1
+        else:
+            o |= 1 << cell
+            if WINNING[o]:
+                return -1
+        x_turn = not x_turn
+    return 0
+
+############################################### perfect-play table
+def position_index(x, o):
+    """
+    Returns the base-3 number of the position, 0 for empty, 1 for X, 2 for O.
+    """
+    return TERNARY[x] + 2 * TERNARY[o]
+
+def solve_table():
+    """
+    Solves every position reachable from the initial state and
+    returns the perfect-play table as a bytearray.
+    """
+    table = bytearray([UNREACHABLE]) * TABLE_SIZE
+
+    def solve(x, o):
+        index = position_index(x, o)
+        if table[index] != UNREACHABLE:
+            return (table[index] >> 4) - 1
+        if bb_terminal(x, o):
+            value, best = bb_utility(x, o), NO_MOVE
+        else:
+            sign = 1 if bb_player(x, o) == X else -1
+            value, best = None, NO_MOVE
+            for cell in bb_actions(x, o):
+                v = solve(*bb_result(x, o, cell))
+                if value is None or sign * v > sign * value:
+                    value, best = v, cell
+        table[index] = (value + 1) << 4 | best
+        return value
+
+    solve(0, 0)
+    return table
+
+def build_table(path=TABLE_FILE):
+    """
+    Solves the game and writes the perfect-play table to path.
+    """
+    table = solve_table()
+    with open(path, "wb") as f:
+        f.write(table)
+    return table
+
+def load_table(path=TABLE_FILE):
+    """
+    Reads the perfect-play table from path and makes minimax answer from it.
+    """
+    global _table
+    with open(path, "rb") as f:
+        table = f.read()
+    if len(table) != TABLE_SIZE:
+        raise Exception(f"{path} is not a tictactoe table.")
+    _table = table
+    return table
+
+def unload_table():
+    """
+    Makes minimax go back to searching live.
+    """
+    global _table
+    _table = None
+
+def verify_table(table):
+    """
+    Compares every reachable position of table against live search.
+    Returns the list of (x, o) positions that disagree.
+    """
+    mismatches = []
+    for x in range(FULL + 1):
+        for o in range(FULL + 1):
+            if x & o:
+                continue
+            entry = table[position_index(x, o)]
+            if entry == UNREACHABLE:
+                continue
+            value, cell = (entry >> 4) - 1, entry & NO_MOVE
+            if bb_terminal(x, o):
+                ok = cell == NO_MOVE and value == bb_utility(x, o)
+            elif cell == NO_MOVE or (x | o) >> cell & 1:
+                ok = False
+            elif bb_player(x, o) == X:
+                ok = value == _max_value(x, o) == _min_value(*bb_result(x, o, cell))
+            else:
+                ok = value == _min_value(x, o) == _max_value(*bb_result(x, o, cell))
+            if not ok:
+                mismatches.append((x, o))
+    return mismatches
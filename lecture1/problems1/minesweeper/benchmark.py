@@ -0,0 +1,75 @@
+import multiprocessing
+import random
+import sys
+import time
+
+from minesweeper import Minesweeper, MinesweeperAI
+
+
+def play(seed, height=8, width=8, mines=8):
+    """
+    Plays one game of MinesweeperAI without a display, with the board and
+    every random choice drawn from seed. Returns (won, move times), the
+    time of each move being what the AI spent choosing it and learning
+    from it.
+    """
+    random.seed(seed)
+    game = Minesweeper(height=height, width=width, mines=mines)
+    ai = MinesweeperAI(height=height, width=width, total_mines=mines)
+    revealed = set()
+    times = []
+    while True:
+        start = time.perf_counter()
+        move = ai.make_safe_move()
+        if move is None:
+            move = ai.make_random_move()
+        if move is None or game.is_mine(move):
+            times.append(time.perf_counter() - start)
+            return False, times
+        ai.add_knowledge(move, game.nearby_mines(move))
+        times.append(time.perf_counter() - start)
+        revealed.add(move)
+        if len(revealed) == height * width - mines:
+            return True, times
+
+
+def _play_worker(args):
+    return play(*args)
+
+
+def percentile(values, fraction):
+    """
+    Returns the value below which fraction of the sorted values lie.
+    """
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def main():
+    if len(sys.argv) > 6:
+        sys.exit("Usage: python benchmark.py [games] [height] [width] [mines] [processes]")
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    height = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    width = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+    mines = int(sys.argv[4]) if len(sys.argv) > 4 else 8
+    processes = int(sys.argv[5]) if len(sys.argv) > 5 else multiprocessing.cpu_count()
+
+    # Game i is always played with seed i, whatever the number of processes
+    jobs = [(seed, height, width, mines) for seed in range(games)]
+    start = time.perf_counter()
+    with multiprocessing.Pool(processes) as pool:
+        results = pool.map(_play_worker, jobs, chunksize=max(1, games // (4 * processes)))
+    elapsed = time.perf_counter() - start
+
+    wins = sum(won for won, _ in results)
+    times = sorted(t for _, move_times in results for t in move_times)
+    print(f"{games} games on {height} x {width} with {mines} mines, {processes} processes")
+    print(f"Won {wins} ({100 * wins / games:.1f}%) in {elapsed:.2f}s")
+    print(f"{len(times)} moves, {len(times) / sum(times):.0f} moves/s of AI time")
+    print("Move time: " + ", ".join(
+        f"p{int(fraction * 100)} {percentile(times, fraction) * 1000:.3f} ms"
+        for fraction in (0.5, 0.9, 0.99)
+    ) + f", max {times[-1] * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,10 @@
 import itertools
+import math
 import random
-import copy
+import time
+
+from collections import defaultdict, deque
+from collections.abc import MutableSequence
 
 
 class Minesweeper():
@@ -102,6 +106,12 @@ class Sentence():
     def __str__(self):
         return f"{self.cells} = {self.count}"
 
+    def key(self):
+        """
+        Returns an immutable snapshot of the sentence, equal for equal sentences.
+        """
+        return frozenset(self.cells), self.count
+
     def known_mines(self):
         """
         Returns the set of all cells in self.cells known to be mines.
@@ -135,17 +145,55 @@ class Sentence():
             self.cells.remove(cell)
 
 
+class Knowledge(MutableSequence):
+    """
+    List of the sentences a MinesweeperAI knows, in the order they were
+    added. Sentences put in the list go through ai.add_sentence, and are
+    reduced, merged or concluded from like any other.
+    """
+
+    def __init__(self, ai):
+        self.ai = ai
+
+    def __getitem__(self, i):
+        return list(self.ai.sentences.values())[i]
+
+    def __len__(self):
+        return len(self.ai.sentences)
+
+    def __delitem__(self, i):
+        sentences = self[i] if isinstance(i, slice) else [self[i]]
+        for sentence in sentences:
+            self.ai.discard_sentence(sentence.key())
+
+    def __setitem__(self, i, sentence):
+        del self[i]
+        self.insert(i, sentence)
+
+    def insert(self, i, sentence):
+        self.ai.add_sentence(sentence)
+        self.ai.infer()
+
+    def __repr__(self):
+        return repr(list(self))
+
+
 class MinesweeperAI():
     """
     Minesweeper game player
     """
 
-    def __init__(self, height=8, width=8):
+    def __init__(self, height=8, width=8, total_mines=None, time_limit=0.1):
 
         # Set initial height and width
         self.height = height
         self.width = width
 
+        # Number of mines on the board, if known, and seconds allowed
+        # for working out mine probabilities on each guess
+        self.total_mines = total_mines
+        self.time_limit = time_limit
+
         # Keep track of which cells have been clicked on
         self.moves_made = set()
 
@@ -153,26 +201,151 @@ class MinesweeperAI():
         self.mines = set()
         self.safes = set()
 
-        # List of sentences about the game known to be true
-        self.knowledge = []
+        # Sentences about the game known to be true, by key, and the
+        # keys of the sentences each cell appears in
+        self.sentences = {}
+        self.index = defaultdict(set)
+
+        # Keys of sentences not yet compared with the others, and
+        # (cell, is_mine) conclusions not yet marked
+        self.worklist = deque()
+        self.conclusions = deque()
+
+        # Results of solve_component by sentence keys
+        self.component_cache = {}
+
+    @property
+    def knowledge(self):
+        """
+        List of sentences about the game known to be true.
+        """
+        return Knowledge(self)
+
+    @knowledge.setter
+    def knowledge(self, sentences):
+        sentences = list(sentences)
+        for key in list(self.sentences):
+            self.discard_sentence(key)
+        for sentence in sentences:
+            self.add_sentence(sentence)
+        self.infer()
 
     def mark_mine(self, cell):
         """
         Marks a cell as a mine, and updates all knowledge
         to mark that cell as a mine as well.
         """
-        self.mines.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_mine(cell)
+        self._mark_mine(cell)
+        self.infer()
 
     def mark_safe(self, cell):
         """
         Marks a cell as safe, and updates all knowledge
         to mark that cell as safe as well.
         """
+        self._mark_safe(cell)
+        self.infer()
+
+    def _mark_mine(self, cell):
+        """
+        Marks a cell as a mine in all knowledge, queueing the sentences
+        it was in for infer.
+        """
+        self.mines.add(cell)
+        for sentence in self.remove_sentences(cell):
+            sentence.mark_mine(cell)
+            self.add_sentence(sentence)
+
+    def _mark_safe(self, cell):
+        """
+        Marks a cell as safe in all knowledge, queueing the sentences
+        it was in for infer.
+        """
         self.safes.add(cell)
-        for sentence in self.knowledge:
+        for sentence in self.remove_sentences(cell):
             sentence.mark_safe(cell)
+            self.add_sentence(sentence)
+
+    def add_sentence(self, sentence):
+        """
+        Adds sentence to the knowledge base without the cells already
+        known, unless it is empty or already known, and queues it for
+        inference. Returns True if it was added.
+        """
+        for cell in sentence.cells & self.mines:
+            sentence.mark_mine(cell)
+        for cell in sentence.cells & self.safes:
+            sentence.mark_safe(cell)
+        key = sentence.key()
+        if not sentence.cells or key in self.sentences:
+            return False
+
+        # all safe or all mines, nothing left to remember
+        if sentence.count == 0 or sentence.count == len(sentence.cells):
+            is_mine = sentence.count > 0
+            self.conclusions.extend((cell, is_mine) for cell in sentence.cells)
+            return False
+        self.sentences[key] = sentence
+        for cell in sentence.cells:
+            self.index[cell].add(key)
+        self.worklist.append(key)
+        return True
+
+    def remove_sentences(self, cell):
+        """
+        Removes the sentences containing cell from the knowledge base
+        and returns them.
+        """
+        return [self.discard_sentence(key) for key in list(self.index.get(cell, ()))]
+
+    def discard_sentence(self, key):
+        """
+        Removes the sentence with key from the knowledge base and returns it.
+        """
+        sentence = self.sentences.pop(key)
+        for cell in key[0]:
+            self.index[cell].discard(key)
+            if not self.index[cell]:
+                del self.index[cell]
+        return sentence
+
+    def related(self, sentence):
+        """
+        Returns the keys of the known sentences sharing a cell with sentence.
+        """
+        keys = set()
+        for cell in sentence.cells:
+            keys.update(self.index.get(cell, ()))
+        return keys
+
+    def infer(self):
+        """
+        Marks queued conclusions and compares queued sentences with the
+        sentences they share cells with until nothing new follows.
+        Whenever one sentence's cells are a subset of another's, the
+        cells left over hold the difference of their counts.
+        """
+        while self.worklist or self.conclusions:
+            while self.conclusions:
+                cell, is_mine = self.conclusions.popleft()
+                if is_mine and cell not in self.mines:
+                    self._mark_mine(cell)
+                elif not is_mine and cell not in self.safes:
+                    self._mark_safe(cell)
+            if not self.worklist:
+                break
+
+            # Sentences changed since they were queued are queued again
+            key = self.worklist.popleft()
+            if key not in self.sentences:
+                continue
+            cells, count = key
+            for other in self.related(self.sentences[key]):
+                other_cells, other_count = other
+                if other_cells < cells:
+                    self.add_sentence(Sentence(cells - other_cells, count - other_count))
+                elif cells < other_cells:
+                    self.add_sentence(Sentence(other_cells - cells, other_count - count))
 
 
     def add_knowledge(self, cell, count):
@@ -193,7 +366,7 @@ class MinesweeperAI():
         # 1
         self.moves_made.add(cell)
         # 2
-        self.mark_safe(cell)
+        self._mark_safe(cell)
         # 3
         cells_around = set()
         # Loop over all cells within one row and column
@@ -206,8 +379,7 @@ class MinesweeperAI():
                 if 0 <= i < self.height and 0 <= j < self.width:
                     cells_around.add((i, j))
         # check if neighbot cell's state is already determined
-        copied_cells_around = copy.deepcopy(cells_around)
-        for neighbor_cell in copied_cells_around:
+        for neighbor_cell in list(cells_around):
             if neighbor_cell in self.mines:
                 cells_around.remove(neighbor_cell)
                 count -= 1
@@ -216,32 +388,9 @@ class MinesweeperAI():
             else:
                 pass
 
-        new_sentence = Sentence(cells_around, count)
-
-        if count == 0:
-            for cell in cells_around:
-                self.mark_safe(cell)
-
-
-        if self.no_sentence_dupl_check(new_sentence):
-            self.mark_safes_and_mines(new_sentence)
-            # new inferences
-            new_knowledge = []
-            copied_knowledge = copy.deepcopy(self.knowledge)
-            for sentence in copied_knowledge:
-                if sentence.cells.issubset(new_sentence.cells): 
-                    count_differece = new_sentence.count - sentence.count
-                    set_difference = new_sentence.cells.difference(sentence.cells)
-                    if count_differece != 0 and len(set_difference) != count_differece:
-                        new_knowledge.append(Sentence(set_difference, count_differece))
-                if new_sentence.cells.issubset(sentence.cells):
-                    count_differece = sentence.count - new_sentence.count
-                    set_difference = sentence.cells.difference(new_sentence.cells)
-                    if count_differece != 0 and len(set_difference) != count_differece: 
-                        new_knowledge.append(Sentence(set_difference,count_differece))
-            self.knowledge.append(new_sentence)
-            for sentence in new_knowledge:
-                self.add_inference
+        # 4, 5
+        self.add_sentence(Sentence(cells_around, count))
+        self.infer()
 
     def make_safe_move(self):
         """
@@ -265,76 +414,206 @@ class MinesweeperAI():
     def make_random_move(self):
         """
         Returns a move to make on the Minesweeper board.
-        Should choose randomly among cells that:
+        Chooses among cells that:
             1) have not already been chosen, and
             2) are not known to be mines
+        one with the lowest probability of being a mine.
         """
-        all_possible_moves = set()
-        for i in range(self.height):
-            for j in range(self.width):
-                all_possible_moves.add((i, j))
-        all_possible_moves = all_possible_moves.difference(self.moves_made)
-        all_possible_moves = all_possible_moves.difference(self.mines)
-        if all_possible_moves:
-            return random.choice(tuple(all_possible_moves))
+        probabilities = self.mine_probabilities()
+        if not probabilities:
+            return None
+        lowest = min(probabilities.values())
+        return random.choice([cell for cell, p in probabilities.items()
+                              if p <= lowest + 1e-9])
+
+    def mine_probabilities(self):
+        """
+        Returns the probability of being a mine of every cell that has
+        not been chosen and is not known to be a mine, over all mine
+        placements consistent with the knowledge (and total_mines).
+
+        Cells in sentences (the frontier) are split into components
+        that share no sentence, each enumerated on its own. A component
+        that takes longer than time_limit gets each cell's highest
+        count / cells ratio among its sentences instead.
+        """
+        deadline = time.perf_counter() + self.time_limit
+        candidates = {(i, j) for i in range(self.height) for j in range(self.width)}
+        candidates -= self.moves_made | self.mines
+        probabilities = {cell: 0.0 for cell in candidates & self.safes}
+        frontier = set().union(*[cells for cells, _ in self.sentences])
+        interior = candidates - self.safes - frontier
+
+        solved = []
+        cache = {}
+        for keys in self.components():
+            result = self.component_cache.get(keys)
+            if result is None:
+                result = self.solve_component(keys, deadline)
+            cache[keys] = result
+            if result is None:
+                for cell, p in self.estimate_component(keys).items():
+                    probabilities[cell] = p
+            else:
+                solved.append(result)
+
+        # Only the current components can come back after the next move
+        self.component_cache = {keys: result for keys, result in cache.items()
+                                if result is not None}
+
+        # weight(m) is the number of ways of placing the remaining
+        # mines in the interior given m mines in solved components
+        distributions = [weights for weights, _ in solved]
+        distribution = convolve(distributions)
+        remaining = None if self.total_mines is None else self.total_mines - len(self.mines)
+
+        def weight(m):
+            if remaining is None:
+                return 1
+            left = remaining - m
+            return math.comb(len(interior), left) if 0 <= left <= len(interior) else 0
+
+        total = sum(ways * weight(m) for m, ways in distribution.items())
+        if total == 0:
+            # Possible only when components were given up on
+            remaining = None
+            total = sum(distribution.values())
+
+        for i, (weights, cell_counts) in enumerate(solved):
+            others = convolve(distributions[:i] + distributions[i + 1:])
+            for cell, by_mines in cell_counts.items():
+                mine_ways = sum(count * ways * weight(m + n)
+                                for m, count in by_mines.items()
+                                for n, ways in others.items())
+                probabilities[cell] = mine_ways / total
+
+        # Without a mine count, interior cells are taken to be as
+        # likely mines as the frontier ones
+        if remaining is None:
+            frontier = [p for _, cell_counts in solved for p in
+                        (probabilities[cell] for cell in cell_counts)]
+            density = sum(frontier) / len(frontier) if frontier else 0.5
         else:
+            interior_mines = sum(ways * weight(m) * (remaining - m)
+                                 for m, ways in distribution.items())
+            density = interior_mines / total / len(interior) if interior else 0.0
+        for cell in interior:
+            probabilities[cell] = density
+        return probabilities
+
+    def components(self):
+        """
+        Returns the keys of the known sentences grouped into components
+        connected by shared cells, each as a frozenset.
+        """
+        components = []
+        seen = set()
+        for start in self.sentences:
+            if start in seen:
+                continue
+            seen.add(start)
+            stack = [start]
+            component = []
+            while stack:
+                key = stack.pop()
+                component.append(key)
+                for cell in key[0]:
+                    for other in self.index.get(cell, ()):
+                        if other not in seen:
+                            seen.add(other)
+                            stack.append(other)
+            components.append(frozenset(component))
+        return components
+
+    def solve_component(self, keys, deadline):
+        """
+        Enumerates the mine placements satisfying the sentences keys by
+        backtracking. Returns (weights, cell_counts): weights[m] is the
+        number of placements with m mines, cell_counts[cell][m] the
+        number of those where cell is a mine. Returns None after deadline.
+        """
+        sentences = [(cells, count) for cells, count in keys]
+        containing = defaultdict(list)
+        for s, (cells, _) in enumerate(sentences):
+            for cell in cells:
+                containing[cell].append(s)
+
+        # Cells in the order they are reached through sentences, so
+        # that sentences are completed early
+        order = []
+        placed = set()
+        for cells, _ in sorted(sentences, key=lambda sentence: len(sentence[0])):
+            for cell in sorted(cells):
+                if cell not in placed:
+                    placed.add(cell)
+                    order.append(cell)
+
+        mines = [0] * len(sentences)
+        unassigned = [len(cells) for cells, _ in sentences]
+        counts = [count for _, count in sentences]
+        assignment = []
+        weights = defaultdict(int)
+        cell_counts = {cell: defaultdict(int) for cell in order}
+        nodes = 0
+
+        def place(depth):
+            nonlocal nodes
+            nodes += 1
+            if nodes % 1024 == 0 and time.perf_counter() > deadline:
+                raise TimeoutError
+            if depth == len(order):
+                m = sum(assignment)
+                weights[m] += 1
+                for cell, is_mine in zip(order, assignment):
+                    if is_mine:
+                        cell_counts[cell][m] += 1
+                return
+            cell = order[depth]
+            for is_mine in (0, 1):
+                ok = True
+                for s in containing[cell]:
+                    unassigned[s] -= 1
+                    mines[s] += is_mine
+                    if mines[s] > counts[s] or mines[s] + unassigned[s] < counts[s]:
+                        ok = False
+                if ok:
+                    assignment.append(is_mine)
+                    place(depth + 1)
+                    assignment.pop()
+                for s in containing[cell]:
+                    unassigned[s] += 1
+                    mines[s] -= is_mine
+
+        try:
+            place(0)
+        except TimeoutError:
             return None
-    
-
-    def mark_safes_and_mines(self, new_sentence):
-        if self.no_sentence_dupl_check(new_sentence): # this ensures there is no same sentence
-            copied_knowledge = copy.deepcopy(self.knowledge)
-            for sentence in copied_knowledge:
-                if sentence.cells.issubset(new_sentence.cells):
-                    count_differece = new_sentence.count - sentence.count
-                    set_difference = new_sentence.cells.difference(sentence.cells)
-                    if count_differece == 0: # all safe cells
-                        for cell in set_difference:
-                            self.mark_safe(cell)
-                    elif len(set_difference) == count_differece: # all mines
-                        for cell in set_difference:
-                            self.mark_mine(cell)
-                    else:
-                        pass
-                if new_sentence.cells.issubset(sentence.cells):
-                    count_differece = sentence.count - new_sentence.count
-                    set_difference = sentence.cells.difference(new_sentence.cells)
-                    if count_differece == 0: # all safe cells
-                        for cell in set_difference:
-                            self.mark_safe(cell)
-                    elif len(set_difference) == count_differece: # all mines
-                        for cell in set_difference:
-                            self.mark_mine(cell)
-                    else:
-                        pass
-
-
-    def no_sentence_dupl_check(self, new_sentence): # true if there is no duplication
-        checker = True
-        for sentence in self.knowledge:
-            if new_sentence == sentence:
-                checker = False
-                break
-        return checker
-    
-
-    def add_inference(self, new_sentence):
-        self.mark_safes_and_mines(new_sentence)
-        copied_knowledge = copy.deepcopy(self.knowledge)
-        self.knowledge.append(new_sentence)
-        for sentence in copied_knowledge:
-            if sentence.cells.issubset(new_sentence.cells): 
-                count_differece = new_sentence.count - sentence.count
-                set_difference = new_sentence.cells.difference(sentence.cells)
-                if count_differece != 0 and len(set_difference) != count_differece:
-                    self.knowledge.append(Sentence(set_difference, count_differece))
-            
-            if new_sentence.cells.issubset(sentence.cells):
-                count_differece = sentence.count - new_sentence.count
-                set_difference = sentence.cells.difference(new_sentence.cells)
-                if count_differece != 0 and len(set_difference) != count_differece: 
-                    self.knowledge.append(Sentence(set_difference,count_differece))
+        return dict(weights), {cell: dict(by_mines) for cell, by_mines in cell_counts.items()}
+
+    def estimate_component(self, keys):
+        """
+        Returns each cell's highest count / cells ratio among the sentences keys.
+        """
+        estimates = {}
+        for cells, count in keys:
+            for cell in cells:
+                estimates[cell] = max(estimates.get(cell, 0.0), count / len(cells))
+        return estimates
+
 
+def convolve(distributions):
+    """
+    Returns the distribution of the total number of mines, given the
+    {mines: ways} distribution of each independent component.
+    """
+    result = {0: 1}
+    for distribution in distributions:
+        combined = defaultdict(int)
+        for a, x in result.items():
+            for b, y in distribution.items():
+                combined[a + b] += x * y
+        result = combined
+    return result
 
 # def add_inferences_to_knowledge(knowledge, new_sentence): # recursion....
 #     copied_knowledge = copy.copy(knowledge) # before adding the sentence
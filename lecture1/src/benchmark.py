@@ -0,0 +1,93 @@
+import json
+import sys
+import time
+import tracemalloc
+
+from logic import *
+from puzzles import GENERATORS
+
+# Puzzle sizes, smallest first
+SIZES = {
+    "mastermind": [3, 4, 5, 6],
+    "clue": [3, 4, 6, 8],
+    "knights": [3, 5, 8, 10]
+}
+
+# Backends that walk the truth table stop being worth running here
+MAX_TABLE_SYMBOLS = 24
+ENUMERATING = {"enumerate", "compiled", "numpy", "parallel", "gray"}
+
+
+def ask_all(knowledge, symbols, method):
+    """Asks knowledge about every symbol and its negation."""
+    return [(model_check(knowledge, symbol, method),
+             model_check(knowledge, Not(symbol), method))
+            for symbol in symbols]
+
+
+def run(knowledge, symbols, method):
+    """
+    Returns (answers, seconds, work done, peak bytes) of asking every
+    query. Memory is measured asking the first query again, as tracing
+    slows Python down.
+    """
+    work_done.clear()
+    start = time.perf_counter()
+    answers = ask_all(knowledge, symbols, method)
+    elapsed = time.perf_counter() - start
+    work = dict(work_done)
+    tracemalloc.start()
+    model_check(knowledge, symbols[0], method)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return answers, elapsed, work, peak
+
+
+def main():
+    if len(sys.argv) > 3:
+        sys.exit("Usage: python benchmark.py [seconds] [results.json]")
+    time_limit = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+    methods = ["enumerate"] + sorted(METHODS)
+
+    results = []
+    for puzzle, generator in GENERATORS.items():
+
+        # A backend over the time limit is not run on bigger puzzles, nor
+        # an enumerating one whose time per model at the last size
+        # predicts it would go over
+        too_slow = set()
+        per_model = dict()
+        for size in SIZES[puzzle]:
+            knowledge, symbols = generator(size)
+            n = len(simplify(knowledge).symbols())
+            print(f"{puzzle} {size}: {n} symbols after simplification, "
+                  f"{2 ** n} models")
+            expected = None
+            for method in methods:
+                if method in too_slow or (method in ENUMERATING and n > MAX_TABLE_SYMBOLS):
+                    continue
+                if method in per_model and per_model[method] * 2 ** n > time_limit:
+                    print(f"    {method:10} skipped, about {per_model[method] * 2 ** n:.0f} s")
+                    continue
+                answers, elapsed, work, peak = run(knowledge, symbols, method)
+                if method in ENUMERATING:
+                    per_model[method] = elapsed / 2 ** n
+                if expected is None:
+                    expected = answers
+                elif answers != expected:
+                    sys.exit(f"{method} disagrees on {puzzle} {size}")
+                if elapsed > time_limit:
+                    too_slow.add(method)
+                amounts = ", ".join(f"{amount} {unit}" for unit, amount in sorted(work.items()))
+                print(f"    {method:10} {elapsed * 1000:10.2f} ms {peak / 1024:10.0f} KiB   "
+                      f"{amounts or 'nothing'}")
+                results.append(dict(puzzle=puzzle, size=size, symbols=n, method=method,
+                                    elapsed=elapsed, work=work, peak=peak))
+
+    if len(sys.argv) == 3:
+        with open(sys.argv[2], "w") as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
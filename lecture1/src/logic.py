@@ -1,19 +1,131 @@
+import heapq
 import itertools
+import json
+import math
+import multiprocessing
+import os
+import re
+import weakref
+
+from collections import defaultdict
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class EvaluationException(Exception):
+    pass
+
+
+class Interned(type):
+    """
+    Metaclass that hash-conses sentences: calling a class with arguments
+    structurally equal to an earlier call returns the earlier instance.
+    Classes with interned = False build a new instance on every call.
+    An And passed as an argument is frozen first, so that it can no
+    longer change under the sentences built from it.
+    """
+
+    instances = weakref.WeakValueDictionary()
+
+    def __call__(cls, *arguments):
+        for argument in arguments:
+            if getattr(argument, "mutable", False):
+                argument.freeze()
+        if not cls.interned:
+            return super().__call__(*arguments)
+        key = (cls, *arguments)
+        instance = Interned.instances.get(key)
+        if instance is None:
+            instance = super().__call__(*arguments)
+            Interned.instances[key] = instance
+        return instance
+
+
+class Sentence(metaclass=Interned):
+
+    # Sentences are immutable, and structurally equal ones are shared.
+    # Each caches its hash, symbol set and formula string. The exception
+    # is an And, which grows with add() until it is frozen.
+    interned = True
+    mutable = False
+    _hash = None
+    _symbols = None
+    _formula = None
 
+    def __eq__(self, other):
+        return self is other or (
+            type(self) is type(other)
+            and hash(self) == hash(other)
+            and self.arguments() == other.arguments()
+        )
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash((type(self).__name__, *[
+                hash(argument) for argument in self.arguments()
+            ]))
+        return self._hash
+
+    def __reduce__(self):
+        # Rebuild through the constructor so unpickled sentences are
+        # interned and rehashed in the receiving process
+        return (self.__class__, self.arguments())
 
-class Sentence():
+    def arguments(self):
+        """Returns the arguments the sentence was constructed from."""
+        return ()
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
         raise Exception("nothing to evaluate")
 
+    def evaluate_partial(self, model):
+        """Evaluates the logical sentence in a model that may leave
+        symbols out, returning None if their values would matter."""
+        raise Exception("nothing to evaluate")
+
     def formula(self):
         """Returns string formula representing logical sentence."""
         return ""
 
     def symbols(self):
         """Returns a set of all symbols in the logical sentence."""
-        return set()
+        return set(self.symbol_set())
+
+    def symbol_set(self):
+        """Returns the cached frozenset of symbols in the sentence."""
+        if self._symbols is None:
+            self._symbols = frozenset().union(*[
+                argument.symbol_set() for argument in self.arguments()
+                if isinstance(argument, Sentence)
+            ])
+        return self._symbols
+
+    def clauses(self, cnf, positive=True):
+        """Returns CNF clauses for the sentence (or its negation)."""
+        raise Exception("nothing to convert")
+
+    def expression(self, variables):
+        """Returns Python expression source evaluating the sentence,
+        given expression source for each symbol name in variables."""
+        raise Exception("nothing to compile")
+
+    def vectorize(self, columns):
+        """Evaluates the sentence on packed uint64 truth table columns,
+        given the column of each symbol name in columns."""
+        raise Exception("nothing to vectorize")
+
+    def bdd(self, manager):
+        """Returns the node of the sentence in a BDD manager."""
+        raise Exception("nothing to compile")
+
+    def simplify(self, facts):
+        """Returns an equivalent, simpler sentence, given that the symbols
+        named in facts have the values they map to."""
+        raise Exception("nothing to simplify")
 
     @classmethod
     def validate(cls, sentence):
@@ -34,7 +146,7 @@ class Sentence():
                         return False
                     count -= 1
             return count == 0
-        if not len(s) or s.isalpha() or (
+        if not len(s) or s.isalpha() or s in ("⊤", "⊥") or (
             s[0] == "(" and s[-1] == ")" and balanced(s[1:-1])
         ):
             return s
@@ -46,12 +158,10 @@ class Symbol(Sentence):
 
     def __init__(self, name):
         self.name = name
+        self._symbols = frozenset([name])
 
-    def __eq__(self, other):
-        return isinstance(other, Symbol) and self.name == other.name
-
-    def __hash__(self):
-        return hash(("symbol", self.name))
+    def arguments(self):
+        return (self.name,)
 
     def __repr__(self):
         return self.name
@@ -62,11 +172,29 @@ class Symbol(Sentence):
         except KeyError:
             raise EvaluationException(f"variable {self.name} not in model")
 
+    def evaluate_partial(self, model):
+        return model.get(self.name)
+
     def formula(self):
         return self.name
 
-    def symbols(self):
-        return {self.name}
+    def clauses(self, cnf, positive=True):
+        variable = cnf.variable(self.name)
+        return [frozenset([variable if positive else -variable])]
+
+    def expression(self, variables):
+        return variables[self.name]
+
+    def vectorize(self, columns):
+        return columns[self.name]
+
+    def bdd(self, manager):
+        return manager.variable(self.name)
+
+    def simplify(self, facts):
+        if self.name in facts:
+            return And() if facts[self.name] else Or()
+        return self
 
 
 class Not(Sentence):
@@ -74,11 +202,8 @@ class Not(Sentence):
         Sentence.validate(operand)
         self.operand = operand
 
-    def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
-
-    def __hash__(self):
-        return hash(("not", hash(self.operand)))
+    def arguments(self):
+        return (self.operand,)
 
     def __repr__(self):
         return f"Not({self.operand})"
@@ -86,26 +211,46 @@ class Not(Sentence):
     def evaluate(self, model):
         return not self.operand.evaluate(model)
 
+    def evaluate_partial(self, model):
+        value = self.operand.evaluate_partial(model)
+        return None if value is None else not value
+
     def formula(self):
-        return "¬" + Sentence.parenthesize(self.operand.formula())
+        if self._formula is None:
+            self._formula = "¬" + Sentence.parenthesize(self.operand.formula())
+        return self._formula
 
-    def symbols(self):
-        return self.operand.symbols()
+    def clauses(self, cnf, positive=True):
+        return cnf.clauses(self.operand, not positive)
+
+    def expression(self, variables):
+        return f"(not {self.operand.expression(variables)})"
+
+    def vectorize(self, columns):
+        return ~self.operand.vectorize(columns)
+
+    def bdd(self, manager):
+        return manager.negate(manager.compile(self.operand))
+
+    def simplify(self, facts):
+        return negation(self.operand.simplify(facts))
 
 
 class And(Sentence):
+
+    # A knowledge base grows with add(), so every And is its own object;
+    # its caches are computed lazily and reset by add(). Once it is an
+    # argument of another sentence it is frozen, and add() raises.
+    interned = False
+    mutable = True
+
     def __init__(self, *conjuncts):
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
         self.conjuncts = list(conjuncts)
 
-    def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
-
-    def __hash__(self):
-        return hash(
-            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
-        )
+    def arguments(self):
+        return tuple(self.conjuncts)
 
     def __repr__(self):
         conjunctions = ", ".join(
@@ -115,34 +260,80 @@ class And(Sentence):
 
     def add(self, conjunct):
         Sentence.validate(conjunct)
+        if not self.mutable:
+            raise ValueError("cannot add to a conjunction inside another sentence")
+        if conjunct.mutable:
+            conjunct.freeze()
         self.conjuncts.append(conjunct)
+        self._hash = None
+        self._symbols = None
+        self._formula = None
+
+    def freeze(self):
+        """Stops the conjunction from growing."""
+        self.mutable = False
 
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
 
-    def formula(self):
-        if len(self.conjuncts) == 1:
-            return self.conjuncts[0].formula()
-        return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
-                           for conjunct in self.conjuncts])
+    def evaluate_partial(self, model):
+        result = True
+        for conjunct in self.conjuncts:
+            value = conjunct.evaluate_partial(model)
+            if value is False:
+                return False
+            if value is None:
+                result = None
+        return result
 
-    def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+    def formula(self):
+        if self._formula is None:
+            if not self.conjuncts:
+                self._formula = "⊤"
+            elif len(self.conjuncts) == 1:
+                self._formula = self.conjuncts[0].formula()
+            else:
+                self._formula = " ∧ ".join([Sentence.parenthesize(conjunct.formula())
+                                            for conjunct in self.conjuncts])
+        return self._formula
+
+    def clauses(self, cnf, positive=True):
+        parts = [cnf.clauses(conjunct, positive) for conjunct in self.conjuncts]
+        return cnf.conjoin(parts) if positive else cnf.disjoin(parts)
+
+    def expression(self, variables):
+        if not self.conjuncts:
+            return "True"
+        return "(" + " and ".join(
+            conjunct.expression(variables) for conjunct in self.conjuncts
+        ) + ")"
+
+    def vectorize(self, columns):
+        result = ~np.uint64(0)
+        for conjunct in self.conjuncts:
+            result = result & conjunct.vectorize(columns)
+        return result
+
+    def bdd(self, manager):
+        result = BDD.TRUE
+        for conjunct in self.conjuncts:
+            result = manager.conjoin(result, manager.compile(conjunct))
+            if result == BDD.FALSE:
+                break
+        return result
+
+    def simplify(self, facts):
+        return simplify_junction(And, self.conjuncts, facts)
 
 
 class Or(Sentence):
     def __init__(self, *disjuncts):
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
-        self.disjuncts = list(disjuncts)
+        self.disjuncts = tuple(disjuncts)
 
-    def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
-
-    def __hash__(self):
-        return hash(
-            ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
-        )
+    def arguments(self):
+        return self.disjuncts
 
     def __repr__(self):
         disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
@@ -151,14 +342,54 @@ class Or(Sentence):
     def evaluate(self, model):
         return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
 
-    def formula(self):
-        if len(self.disjuncts) == 1:
-            return self.disjuncts[0].formula()
-        return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
-                            for disjunct in self.disjuncts])
+    def evaluate_partial(self, model):
+        result = False
+        for disjunct in self.disjuncts:
+            value = disjunct.evaluate_partial(model)
+            if value is True:
+                return True
+            if value is None:
+                result = None
+        return result
 
-    def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+    def formula(self):
+        if self._formula is None:
+            if not self.disjuncts:
+                self._formula = "⊥"
+            elif len(self.disjuncts) == 1:
+                self._formula = self.disjuncts[0].formula()
+            else:
+                self._formula = " ∨  ".join([Sentence.parenthesize(disjunct.formula())
+                                             for disjunct in self.disjuncts])
+        return self._formula
+
+    def clauses(self, cnf, positive=True):
+        parts = [cnf.clauses(disjunct, positive) for disjunct in self.disjuncts]
+        return cnf.disjoin(parts) if positive else cnf.conjoin(parts)
+
+    def expression(self, variables):
+        if not self.disjuncts:
+            return "False"
+        return "(" + " or ".join(
+            disjunct.expression(variables) for disjunct in self.disjuncts
+        ) + ")"
+
+    def vectorize(self, columns):
+        result = np.uint64(0)
+        for disjunct in self.disjuncts:
+            result = result | disjunct.vectorize(columns)
+        return result
+
+    def bdd(self, manager):
+        result = BDD.FALSE
+        for disjunct in self.disjuncts:
+            result = manager.disjoin(result, manager.compile(disjunct))
+            if result == BDD.TRUE:
+                break
+        return result
+
+    def simplify(self, facts):
+        return simplify_junction(Or, self.disjuncts, facts)
 
 
 class Implication(Sentence):
@@ -168,13 +399,8 @@ class Implication(Sentence):
         self.antecedent = antecedent
         self.consequent = consequent
 
-    def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
-
-    def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+    def arguments(self):
+        return (self.antecedent, self.consequent)
 
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
@@ -183,13 +409,58 @@ class Implication(Sentence):
         return ((not self.antecedent.evaluate(model))
                 or self.consequent.evaluate(model))
 
-    def formula(self):
-        antecedent = Sentence.parenthesize(self.antecedent.formula())
-        consequent = Sentence.parenthesize(self.consequent.formula())
-        return f"{antecedent} => {consequent}"
+    def evaluate_partial(self, model):
+        antecedent = self.antecedent.evaluate_partial(model)
+        if antecedent is False:
+            return True
+        consequent = self.consequent.evaluate_partial(model)
+        if consequent is True:
+            return True
+        if antecedent is None or consequent is None:
+            return None
+        return False
 
-    def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+    def formula(self):
+        if self._formula is None:
+            antecedent = Sentence.parenthesize(self.antecedent.formula())
+            consequent = Sentence.parenthesize(self.consequent.formula())
+            self._formula = f"{antecedent} => {consequent}"
+        return self._formula
+
+    def clauses(self, cnf, positive=True):
+        parts = [cnf.clauses(self.antecedent, not positive),
+                 cnf.clauses(self.consequent, positive)]
+        return cnf.disjoin(parts) if positive else cnf.conjoin(parts)
+
+    def expression(self, variables):
+        antecedent = self.antecedent.expression(variables)
+        consequent = self.consequent.expression(variables)
+        return f"(not {antecedent} or {consequent})"
+
+    def vectorize(self, columns):
+        return ~self.antecedent.vectorize(columns) | self.consequent.vectorize(columns)
+
+    def bdd(self, manager):
+        return manager.disjoin(manager.negate(manager.compile(self.antecedent)),
+                               manager.compile(self.consequent))
+
+    def simplify(self, facts):
+        antecedent = self.antecedent.simplify(facts)
+        if is_false(antecedent):
+            return And()
+
+        # The consequent only matters when the antecedent holds
+        assumed = literal(antecedent)
+        if assumed is not None:
+            facts = {**facts, assumed[0]: assumed[1]}
+        consequent = self.consequent.simplify(facts)
+        if is_true(antecedent):
+            return consequent
+        if is_true(consequent) or antecedent == consequent:
+            return And()
+        if is_false(consequent):
+            return negation(antecedent)
+        return Implication(antecedent, consequent)
 
 
 class Biconditional(Sentence):
@@ -199,13 +470,8 @@ class Biconditional(Sentence):
         self.left = left
         self.right = right
 
-    def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
-
-    def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
+    def arguments(self):
+        return (self.left, self.right)
 
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
@@ -216,23 +482,364 @@ class Biconditional(Sentence):
                 or (not self.left.evaluate(model)
                     and not self.right.evaluate(model)))
 
+    def evaluate_partial(self, model):
+        left = self.left.evaluate_partial(model)
+        if left is None:
+            return None
+        right = self.right.evaluate_partial(model)
+        if right is None:
+            return None
+        return left == right
+
     def formula(self):
-        left = Sentence.parenthesize(str(self.left))
-        right = Sentence.parenthesize(str(self.right))
-        return f"{left} <=> {right}"
+        if self._formula is None:
+            left = Sentence.parenthesize(self.left.formula())
+            right = Sentence.parenthesize(self.right.formula())
+            self._formula = f"{left} <=> {right}"
+        return self._formula
+
+    def clauses(self, cnf, positive=True):
+        left_true = cnf.clauses(self.left, True)
+        left_false = cnf.clauses(self.left, False)
+        right_true = cnf.clauses(self.right, True)
+        right_false = cnf.clauses(self.right, False)
+        if positive:
+            return cnf.conjoin([cnf.disjoin([left_false, right_true]),
+                                cnf.disjoin([left_true, right_false])])
+        return cnf.conjoin([cnf.disjoin([left_true, right_true]),
+                            cnf.disjoin([left_false, right_false])])
+
+    def expression(self, variables):
+        left = self.left.expression(variables)
+        right = self.right.expression(variables)
+        return f"(bool({left}) == bool({right}))"
+
+    def vectorize(self, columns):
+        return ~(self.left.vectorize(columns) ^ self.right.vectorize(columns))
+
+    def bdd(self, manager):
+        return manager.negate(manager.xor(manager.compile(self.left),
+                                          manager.compile(self.right)))
+
+    def simplify(self, facts):
+        left = self.left.simplify(facts)
+        right = self.right.simplify(facts)
+        if left == right:
+            return And()
+        if left == negation(right):
+            return Or()
+        for constant, other in ((left, right), (right, left)):
+            if is_true(constant):
+                return other
+            if is_false(constant):
+                return negation(other)
+        return Biconditional(left, right)
+
+
+class Cardinality(Sentence):
+    """
+    Sentence true when the number of true operands is between at_least
+    and at_most. Subclasses fix the bounds; simplify() rewrites any
+    cardinality sentence into the most specific one.
+    """
+
+    def __init__(self, at_least, at_most, operands):
+        for operand in operands:
+            Sentence.validate(operand)
+        self.operands = tuple(operands)
+        self.at_least = at_least
+        self.at_most = at_most
 
-    def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
+    def __repr__(self):
+        operands = ", ".join(str(argument) for argument in self.arguments())
+        return f"{type(self).__name__}({operands})"
 
+    def evaluate(self, model):
+        count = 0
+        for operand in self.operands:
+            if operand.evaluate(model):
+                count += 1
+                if count > self.at_most:
+                    return False
+        return count >= self.at_least
+
+    def evaluate_partial(self, model):
+        count = unknown = 0
+        for operand in self.operands:
+            value = operand.evaluate_partial(model)
+            if value is None:
+                unknown += 1
+            elif value:
+                count += 1
+        if count > self.at_most or count + unknown < self.at_least:
+            return False
+        if count >= self.at_least and count + unknown <= self.at_most:
+            return True
+        return None
 
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
+    def formula(self):
+        if self._formula is None:
+            operands = ", ".join(operand.formula() for operand in self.operands)
+            self._formula = f"{self.name()}({operands})"
+        return self._formula
+
+    def name(self):
+        return type(self).__name__
+
+    def clauses(self, cnf, positive=True):
+        n = len(self.operands)
+        if positive:
+            return cnf.conjoin([cnf.at_least(self.operands, self.at_least),
+                                cnf.at_most(self.operands, self.at_most)])
+        parts = []
+        if self.at_least > 0:
+            parts.append(cnf.at_most(self.operands, self.at_least - 1))
+        if self.at_most < n:
+            parts.append(cnf.at_least(self.operands, self.at_most + 1))
+        return cnf.disjoin(parts)
+
+    def expression(self, variables):
+        count = " + ".join(operand.expression(variables) for operand in self.operands) or "0"
+        return f"({self.at_least} <= ({count}) <= {self.at_most})"
+
+    def vectorize(self, columns):
+        # counters[j] has the bits of the models where more than j
+        # operands seen so far are true
+        n = len(self.operands)
+        ones, zeros = ~np.uint64(0), np.uint64(0)
+        depth = self.at_most + 1 if self.at_most < n else self.at_least
+        counters = [zeros] * depth
+        for operand in self.operands:
+            column = operand.vectorize(columns)
+            for j in range(depth - 1, 0, -1):
+                counters[j] = counters[j] | (counters[j - 1] & column)
+            if depth:
+                counters[0] = counters[0] | column
+        result = counters[self.at_least - 1] if self.at_least > 0 else ones
+        if self.at_most < n:
+            result = result & ~counters[self.at_most]
+        return result
+
+    def bdd(self, manager):
+        n = len(self.operands)
+        nodes = [manager.compile(operand) for operand in self.operands]
+        memo = dict()
+
+        # Node for the operands from i on, count of them being true already
+        def count_from(i, count):
+            if count > self.at_most or count + n - i < self.at_least:
+                return BDD.FALSE
+            if i == n or (count >= self.at_least and count + n - i <= self.at_most):
+                return BDD.TRUE
+            key = (i, count)
+            if key not in memo:
+                memo[key] = manager.disjoin(
+                    manager.conjoin(nodes[i], count_from(i + 1, count + 1)),
+                    manager.conjoin(manager.negate(nodes[i]), count_from(i + 1, count))
+                )
+            return memo[key]
+
+        return count_from(0, 0)
+
+    def simplify(self, facts):
+        at_least, at_most = self.at_least, self.at_most
+        operands = []
+        for operand in self.operands:
+            operand = operand.simplify(facts)
+            if is_true(operand):
+                at_least -= 1
+                at_most -= 1
+            elif not is_false(operand):
+                operands.append(operand)
+        return cardinality(at_least, at_most, operands)
+
+
+class ExactlyOne(Cardinality):
+    def __init__(self, *operands):
+        super().__init__(1, 1, operands)
+
+    def arguments(self):
+        return self.operands
+
+
+class AtMostK(Cardinality):
+    def __init__(self, k, *operands):
+        super().__init__(0, k, operands)
+
+    def arguments(self):
+        return (self.at_most, *self.operands)
+
+    def name(self):
+        return f"AtMost{self.at_most}"
+
+
+class AtLeastK(Cardinality):
+    def __init__(self, k, *operands):
+        super().__init__(k, len(operands), operands)
+
+    def arguments(self):
+        return (self.at_least, *self.operands)
+
+    def name(self):
+        return f"AtLeast{self.at_least}"
+
+
+def cardinality(at_least, at_most, operands):
+    """Returns the simplest sentence true when between at_least and
+    at_most of operands are."""
+    n = len(operands)
+    at_least = max(at_least, 0)
+    at_most = min(at_most, n)
+    if at_least > at_most:
+        return Or()
+    if at_least == 0 and at_most == n:
+        return And()
+    if at_most == 0:
+        return simplify_junction(And, [negation(operand) for operand in operands], dict())
+    if at_least == n:
+        return simplify_junction(And, operands, dict())
+    if at_least == 1 and at_most == n:
+        return simplify_junction(Or, operands, dict())
+    if at_least == 1 and at_most == 1:
+        return ExactlyOne(*operands)
+    if at_least == 0:
+        return AtMostK(at_most, *operands)
+    if at_most == n:
+        return AtLeastK(at_least, *operands)
+    return And(AtLeastK(at_least, *operands), AtMostK(at_most, *operands))
+
+
+# True and false are the empty And and the empty Or
+
+def is_true(sentence):
+    return isinstance(sentence, And) and not sentence.conjuncts
+
+
+def is_false(sentence):
+    return isinstance(sentence, Or) and not sentence.disjuncts
+
+
+def negation(sentence):
+    """Returns the negation of sentence, cancelling double negations."""
+    if isinstance(sentence, Not):
+        return sentence.operand
+    if is_true(sentence):
+        return Or()
+    if is_false(sentence):
+        return And()
+    return Not(sentence)
+
+
+def literal(sentence):
+    """Returns (name, value) if sentence is a symbol or its negation."""
+    if isinstance(sentence, Symbol):
+        return sentence.name, True
+    if isinstance(sentence, Not) and isinstance(sentence.operand, Symbol):
+        return sentence.operand.name, False
+    return None
+
+
+def simplify_junction(cls, parts, facts):
+    """
+    Simplifies an And (or Or) of parts: nested ones are flattened,
+    constants folded, duplicates removed, and the other parts simplified
+    assuming each literal part is true (false), until no new literals
+    turn up.
+    """
+    conjunction = cls is And
+    identity, absorbing = (is_true, is_false) if conjunction else (is_false, is_true)
+    facts = dict(facts)
+    literals = []
+    while True:
+        simplified = dict()
+        stack = [part.simplify(facts) for part in reversed(parts)]
+        found = False
+        while stack:
+            part = stack.pop()
+            if isinstance(part, cls):
+                stack.extend(reversed(part.arguments()))
+                continue
+            if absorbing(part):
+                return part
+            if identity(part):
+                continue
+            assumed = literal(part)
+            if assumed is not None:
+                name, value = assumed
+                if not conjunction:
+                    value = not value
+                if name in facts:
+                    if facts[name] != value:
+                        return And() if not conjunction else Or()
+                    continue
+                facts[name] = value
+                literals.append(part)
+                found = True
+            else:
+                simplified[part] = None
+        parts = list(simplified)
+        if not found:
+            break
+
+    parts = literals + parts
+    seen = set(parts)
+    if any(negation(part) in seen for part in parts if not literal(part)):
+        return Or() if conjunction else And()
+    if len(parts) == 1:
+        return parts[0]
+    return cls(*parts)
+
+
+def simplify(sentence, facts=None):
+    """
+    Returns a sentence equivalent to sentence (in the models where the
+    symbols named in facts have the values they map to) with nested
+    connectives flattened, duplicates, constants and double negations
+    removed, and subformulas rewritten under the literals around them.
+    """
+    return sentence.simplify(facts or dict())
+
+
+def unit_facts(sentence):
+    """Returns the values of the literals sentence is a conjunction of."""
+    facts = dict()
+    for conjunct in conjuncts_of(sentence):
+        assumed = literal(conjunct)
+        if assumed is not None:
+            facts[assumed[0]] = assumed[1]
+    return facts
+
+
+# Work done by the inference backends since it was last cleared, by unit:
+# "models" evaluated by the enumerating ones, search "nodes" of prune,
+# "decisions" and "propagations" of dpll, "BDD nodes" built and
+# "resolvents" kept
+work_done = defaultdict(int)
+
+
+def model_check(knowledge, query, method="enumerate"):
+    """Checks if knowledge base entails query.
+
+    method selects the inference backend, one of "enumerate" (truth
+    table enumeration, below) or a key of METHODS. Both sentences are
+    simplified first, the query under the literals of the knowledge base.
+    """
+    knowledge = simplify(knowledge)
+    query = simplify(query, unit_facts(knowledge))
+    if is_false(knowledge) or is_true(query):
+        return True
+
+    if method != "enumerate":
+        if method not in METHODS:
+            raise ValueError(f"unknown model checking method {method}")
+        return METHODS[method](knowledge, query)
 
     def check_all(knowledge, query, symbols, model):
         """Checks if knowledge base entails query, given a particular model."""
 
         # If model has an assignment for each symbol
         if not symbols:
+            work_done["models"] += 1
 
             # If knowledge base is true in model, then query must also be true
             if knowledge.evaluate(model):
@@ -261,3 +868,1140 @@ def model_check(knowledge, query):
 
     # Check that knowledge entails query
     return check_all(knowledge, query, symbols, dict())
+
+
+class CNF():
+    """
+    Set of clauses in conjunctive normal form.
+
+    Clauses are frozensets of non-zero integer literals: variable v is
+    the literal v and its negation -v. Subformulas whose distribution
+    would produce more than `limit` clauses are replaced by a fresh
+    definition variable d with clauses d => subformula, which keeps the
+    clause set satisfiable exactly when the sentences are.
+    """
+
+    def __init__(self, limit=16):
+        self.limit = limit
+        self.names = [None]
+        self.variables = dict()
+        self.definitions = []
+        self.memo = dict()
+
+    def variable(self, name):
+        """Returns the variable for the symbol called name."""
+        if name not in self.variables:
+            self.variables[name] = len(self.names)
+            self.names.append(name)
+        return self.variables[name]
+
+    def fresh(self):
+        """Returns a new variable standing for no symbol."""
+        self.names.append(None)
+        return len(self.names) - 1
+
+    def define(self, clauses):
+        """Returns a new variable that implies clauses."""
+        variable = self.fresh()
+        self.definitions.extend(clause | {-variable} for clause in clauses)
+        return variable
+
+    def literal(self, sentence, positive=True):
+        """
+        Returns a literal implied by sentence (or its negation): the
+        symbol's own literal, or else the negation of a new variable
+        implying the opposite.
+        """
+        if isinstance(sentence, Symbol):
+            variable = self.variable(sentence.name)
+            return variable if positive else -variable
+        return -self.define(self.clauses(sentence, not positive))
+
+    def at_most(self, sentences, k, positive=True):
+        """
+        Returns clauses asserting that at most k of sentences are true
+        (false), with Sinz's sequential counter: register r[i][j] is
+        implied by more than j of the first i + 1 literals being true.
+        """
+        n = len(sentences)
+        if k >= n:
+            return []
+        if k < 0:
+            return [frozenset()]
+        literals = [self.literal(sentence, positive) for sentence in sentences]
+        if k == 0:
+            return [frozenset([-x]) for x in literals]
+        clauses = []
+        registers = []
+        for i, x in enumerate(literals):
+            if i == n - 1:
+                clauses.append(frozenset([-x, -registers[i - 1][k - 1]]))
+                break
+            r = [self.fresh() for _ in range(k)]
+            clauses.append(frozenset([-x, r[0]]))
+            if i > 0:
+                previous = registers[i - 1]
+                clauses.append(frozenset([-x, -previous[k - 1]]))
+                for j in range(k):
+                    clauses.append(frozenset([-previous[j], r[j]]))
+                    if j > 0:
+                        clauses.append(frozenset([-x, -previous[j - 1], r[j]]))
+            registers.append(r)
+        return clauses
+
+    def at_least(self, sentences, k):
+        """Returns clauses asserting that at least k of sentences are true."""
+        return self.at_most(sentences, len(sentences) - k, positive=False)
+
+    def clauses(self, sentence, positive=True):
+        """Returns clauses for sentence (or its negation), memoized."""
+        key = (id(sentence), positive)
+        if key not in self.memo:
+            self.memo[key] = (sentence, sentence.clauses(self, positive))
+        return self.memo[key][1]
+
+    def conjoin(self, parts):
+        return [clause for clauses in parts for clause in clauses]
+
+    def disjoin(self, parts):
+        result = [frozenset()]
+        for clauses in parts:
+            if len(result) * len(clauses) > self.limit:
+                if len(clauses) > 1:
+                    clauses = [frozenset([self.define(clauses)])]
+                if len(result) > 1:
+                    result = [frozenset([self.define(result)])]
+            result = [a | b for a in result for b in clauses
+                      if not any(-literal in a for literal in b)]
+        return result
+
+    def encode(self, *sentences):
+        """Returns the clauses asserting all of sentences."""
+        clauses = self.conjoin([self.clauses(sentence) for sentence in sentences])
+        return clauses + self.definitions
+
+
+def dpll(clauses):
+    """
+    Returns a satisfying assignment {variable: bool} for CNF clauses,
+    or None if they are unsatisfiable.
+
+    Davis-Putnam-Logemann-Loveland search with unit propagation over two
+    watched literals per clause, pure literal elimination up front and
+    branching on the variable with the highest Jeroslow-Wang score.
+    """
+    clauses = [list(clause) for clause in set(map(frozenset, clauses))]
+    value = dict()
+    trail = []
+
+    def assign(literal):
+        value[abs(literal)] = literal > 0
+        trail.append(literal)
+
+    def literal_value(literal):
+        v = value.get(abs(literal))
+        return None if v is None else v == (literal > 0)
+
+    # Watch the first two literals of every clause, queue unit clauses
+    watches = defaultdict(list)
+    units = []
+    scores = defaultdict(float)
+    for index, clause in enumerate(clauses):
+        if not clause:
+            return None
+        if len(clause) == 1:
+            units.append(clause[0])
+        else:
+            watches[clause[0]].append(index)
+            watches[clause[1]].append(index)
+        for literal in clause:
+            scores[literal] += 2 ** -len(clause)
+
+    # A literal whose negation appears nowhere can simply be made true
+    units.extend(literal for literal in scores if -literal not in scores)
+
+    def propagate(start):
+        """Assigns every literal implied by the trail from start on."""
+        i = start
+        while i < len(trail):
+            false_literal = -trail[i]
+            i += 1
+            watching = watches[false_literal]
+            j = 0
+            while j < len(watching):
+                clause = clauses[watching[j]]
+                if clause[0] == false_literal:
+                    clause[0], clause[1] = clause[1], clause[0]
+                other = clause[0]
+                if literal_value(other):
+                    j += 1
+                    continue
+
+                # Look for another literal to watch
+                for k in range(2, len(clause)):
+                    if literal_value(clause[k]) is not False:
+                        clause[1], clause[k] = clause[k], clause[1]
+                        watches[clause[1]].append(watching[j])
+                        watching[j] = watching[-1]
+                        watching.pop()
+                        break
+                else:
+                    if literal_value(other) is False:
+                        return False
+                    assign(other)
+                    work_done["propagations"] += 1
+                    j += 1
+        return True
+
+    def undo(length):
+        while len(trail) > length:
+            del value[abs(trail.pop())]
+
+    for literal in units:
+        if literal_value(literal) is False:
+            return None
+        if literal_value(literal) is None:
+            assign(literal)
+    if not propagate(0):
+        return None
+
+    variables = sorted({abs(literal) for literal in scores},
+                       key=lambda v: scores[v] + scores[-v], reverse=True)
+
+    # Each decision is (trail length before it, literal, already flipped)
+    decisions = []
+    while True:
+        variable = next((v for v in variables if v not in value), None)
+        if variable is None:
+            return value
+        literal = variable if scores[variable] >= scores[-variable] else -variable
+        start = len(trail)
+        decisions.append((start, literal, False))
+        assign(literal)
+        work_done["decisions"] += 1
+
+        # On conflict, flip the most recent decision not yet flipped
+        while not propagate(start):
+            while decisions and decisions[-1][2]:
+                decisions.pop()
+            if not decisions:
+                return None
+            start, literal, _ = decisions.pop()
+            undo(start)
+            decisions.append((start, -literal, True))
+            assign(-literal)
+            work_done["decisions"] += 1
+
+
+def satisfiable(sentence):
+    """Returns a model of sentence as {symbol: bool}, or None."""
+    cnf = CNF()
+    assignment = dpll(cnf.encode(sentence))
+    if assignment is None:
+        return None
+    return {name: assignment.get(cnf.variables.get(name), False)
+            for name in sentence.symbols()}
+
+
+def dpll_check(knowledge, query):
+    """Checks if knowledge base entails query, as unsatisfiability of
+    knowledge and not query."""
+    cnf = CNF()
+    return dpll(cnf.encode(knowledge, Not(query))) is None
+
+
+def resolve(clauses, support):
+    """
+    Searches for a resolution refutation of clauses + support, where
+    support (the set of support) holds the clauses to start from. Every
+    resolution step uses at least one clause derived from support. The
+    shortest supported clause is resolved first; resolvents subsumed by
+    a kept clause are dropped and kept clauses subsumed by a new
+    resolvent are deleted.
+
+    Returns (steps, proof) where steps lists (clause, parents) for every
+    clause, parents being None for given clauses, and proof lists the
+    indices of the steps deriving the empty clause, or None if support
+    saturates without it.
+    """
+    steps = []
+    alive = set()
+    index = defaultdict(set)
+    queue = []
+
+    def subsumed(clause):
+        candidates = set()
+        for literal in clause:
+            candidates.update(index[literal])
+        return any(steps[other][0] <= clause for other in candidates)
+
+    def keep(clause, parents, supported):
+        if subsumed(clause):
+            return None
+        if clause:
+            # Delete kept clauses that the new one subsumes
+            others = set.intersection(*[index[literal] for literal in clause])
+            for other in others:
+                alive.discard(other)
+                for literal in steps[other][0]:
+                    index[literal].discard(other)
+        number = len(steps)
+        steps.append((clause, parents))
+        if parents is not None:
+            work_done["resolvents"] += 1
+        if supported:
+            heapq.heappush(queue, (len(clause), number))
+        else:
+            alive.add(number)
+            for literal in clause:
+                index[literal].add(number)
+        return number
+
+    def tautology(clause):
+        return any(-literal in clause for literal in clause)
+
+    for clause in sorted(set(clauses), key=len):
+        if not tautology(clause):
+            keep(clause, None, False)
+    for clause in sorted(set(support), key=len):
+        if not tautology(clause):
+            keep(clause, None, True)
+
+    while queue:
+        _, given = heapq.heappop(queue)
+        clause = steps[given][0]
+        if not clause:
+            return steps, proof_of(steps, given)
+        if subsumed(clause):
+            continue
+
+        # Resolve the given clause against every kept clause it clashes with
+        resolvents = []
+        for literal in clause:
+            for other in index[-literal]:
+                resolvent = (clause - {literal}) | (steps[other][0] - {-literal})
+                if not tautology(resolvent):
+                    resolvents.append((resolvent, (given, other)))
+        alive.add(given)
+        for literal in clause:
+            index[literal].add(given)
+        for resolvent, parents in resolvents:
+            number = keep(resolvent, parents, True)
+            if number is not None and not resolvent:
+                return steps, proof_of(steps, number)
+    return steps, None
+
+
+def proof_of(steps, number):
+    """Returns the sorted indices of the steps deriving step number."""
+    proof = set()
+    stack = [number]
+    while stack:
+        step = stack.pop()
+        if step not in proof:
+            proof.add(step)
+            stack.extend(steps[step][1] or ())
+    return sorted(proof)
+
+
+def prove(knowledge, query):
+    """
+    Proves that knowledge entails query by resolution, refuting the
+    clauses of knowledge together with those of not query, the latter
+    serving as set of support.
+
+    Returns a list of proof lines (clause formula, justification), or
+    None if knowledge does not entail query.
+    """
+    cnf = CNF()
+    negated = cnf.clauses(query, False)
+    clauses = cnf.clauses(knowledge) + cnf.definitions
+
+    # Saturating clauses that have no refutation can take very long, so
+    # only search for a proof once DPLL has found there is one
+    if dpll(clauses + negated) is not None:
+        return None
+    steps, proof = resolve(clauses, negated)
+
+    # Set of support is only complete if the knowledge base is satisfiable;
+    # an inconsistent one entails everything, refute it on its own
+    if proof is None and dpll(clauses) is None:
+        steps, proof = resolve([], clauses)
+    if proof is None:
+        return None
+
+    def literal_formula(literal):
+        name = cnf.names[abs(literal)] or f"d{abs(literal)}"
+        return name if literal > 0 else "¬" + Sentence.parenthesize(name)
+
+    lines = []
+    numbers = dict()
+    given = set(negated)
+    for step in proof:
+        clause, parents = steps[step]
+        formula = " ∨ ".join(sorted(literal_formula(literal) for literal in clause)) or "⊥"
+        if parents is not None:
+            reason = f"resolve {numbers[parents[0]]}, {numbers[parents[1]]}"
+        elif clause in given:
+            reason = "negated query"
+        else:
+            reason = "knowledge"
+        numbers[step] = len(lines) + 1
+        lines.append((formula, reason))
+    return lines
+
+
+def resolution_check(knowledge, query):
+    """Checks if knowledge base entails query by resolution."""
+    return prove(knowledge, query) is not None
+
+
+def conjuncts_of(sentence):
+    """Returns the conjuncts of sentence, with nested Ands flattened."""
+    conjuncts = []
+    stack = [sentence]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, And):
+            stack.extend(reversed(node.conjuncts))
+        else:
+            conjuncts.append(node)
+    return conjuncts
+
+
+def gray_check(knowledge, query):
+    """
+    Checks if knowledge base entails query by enumerating integer models
+    in Gray code order without recursion. Consecutive models differ in
+    one bit, which is flipped in place; only the conjuncts of the
+    knowledge base that mention its symbol are evaluated again, and the
+    query only when every conjunct holds.
+    """
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+    conjuncts = conjuncts_of(knowledge)
+    checks = [compile_sentence(conjunct, symbols)[0] for conjunct in conjuncts]
+    query_check, _ = compile_sentence(query, symbols)
+    watching = [[checks[i] for i, conjunct in enumerate(conjuncts)
+                 if name in conjunct.symbol_set()]
+                for name in symbols]
+    query_bits = sum(1 << i for i, name in enumerate(symbols)
+                     if name in query.symbol_set())
+
+    # values[check] is the value of a conjunct in the current model
+    model = 0
+    values = {check: check(model) for check in checks}
+    false = list(values.values()).count(False)
+    query_value = None
+    work_done["models"] += 1
+    if not false:
+        query_value = query_check(model)
+        if not query_value:
+            return False
+
+    # Step k of the Gray code flips the lowest set bit of k
+    for step in range(1, 2 ** len(symbols)):
+        bit = step & -step
+        model ^= bit
+        for check in watching[bit.bit_length() - 1]:
+            value = check(model)
+            if value != values[check]:
+                values[check] = value
+                false += -1 if value else 1
+        if query_bits & bit:
+            query_value = None
+        if not false:
+            if query_value is None:
+                query_value = query_check(model)
+            if not query_value:
+                work_done["models"] += step
+                return False
+    work_done["models"] += 2 ** len(symbols) - 1
+    return True
+
+
+def compile_sentence(sentence, symbols=None):
+    """
+    Compiles sentence into a Python function of an integer model, where
+    bit i is the value of the i-th name in symbols (sorted names of the
+    sentence's symbols by default). Returns (function, symbols).
+    """
+    if symbols is None:
+        symbols = sorted(sentence.symbols())
+    variables = {name: f"(model >> {i} & 1)" for i, name in enumerate(symbols)}
+    source = f"lambda model: bool({sentence.expression(variables)})"
+    return eval(source, {}), symbols
+
+
+def compiled_check(knowledge, query):
+    """Checks if knowledge base entails query by enumerating models
+    in a loop generated and compiled for these two sentences."""
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+    variables = {name: f"v{i}" for i, name in enumerate(symbols)}
+    names = "".join(f"{variables[name]}, " for name in symbols)
+
+    # A counter-model's position in product order, the first symbol
+    # being the most significant bit, is the number of models before it
+    position = " | ".join(f"{variables[name]} << {len(symbols) - 1 - i}"
+                          for i, name in enumerate(symbols)) or "0"
+    source = (
+        f"def check_all(product):\n"
+        f"    for {names or '_'} in product((False, True), repeat={len(symbols)}):\n"
+        f"        if {knowledge.expression(variables)} and not {query.expression(variables)}:\n"
+        f"            return False, ({position}) + 1\n"
+        f"    return True, {2 ** len(symbols)}\n"
+    )
+    namespace = dict()
+    exec(source, namespace)
+    entailed, models = namespace["check_all"](itertools.product)
+    work_done["models"] += models
+    return entailed
+
+
+def symbol_order(*sentences):
+    """Returns the symbols of sentences, most frequently occurring first."""
+    counts = defaultdict(int)
+    stack = list(sentences)
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Symbol):
+            counts[node.name] += 1
+        else:
+            stack.extend(argument for argument in node.arguments()
+                         if isinstance(argument, Sentence))
+    return sorted(counts, key=lambda name: (-counts[name], name))
+
+
+def pruning_check(knowledge, query):
+    """
+    Checks if knowledge base entails query like enumeration, but
+    evaluates both sentences after every assignment, three-valued, and
+    cuts a branch as soon as the knowledge base is false (no models
+    below), the query is true, or the knowledge base is true and the
+    query false (a counter-model). Symbols are assigned most frequent
+    first so that constraints are decided early.
+    """
+    symbols = symbol_order(knowledge, query)
+    model = dict()
+
+    def check_all(depth):
+        work_done["nodes"] += 1
+        kb = knowledge.evaluate_partial(model)
+        if kb is False:
+            return True
+        q = query.evaluate_partial(model)
+        if q is True:
+            return True
+        if kb is True and q is False:
+            return False
+        p = symbols[depth]
+        for value in (True, False):
+            model[p] = value
+            if not check_all(depth + 1):
+                del model[p]
+                return False
+        del model[p]
+        return True
+
+    return check_all(0)
+
+
+def compile_partition_check(knowledge, query, symbols, fixed):
+    """
+    Compiles a function check_partition(prefix) that checks entailment in
+    the models where the first `fixed` of symbols take the values of the
+    bits of prefix (bit i for symbol i), enumerating the others.
+    """
+    variables = {name: f"v{i}" for i, name in enumerate(symbols)}
+    prefix = "".join(f"    {variables[name]} = bool(prefix >> {i} & 1)\n"
+                     for i, name in enumerate(symbols[:fixed]))
+    names = "".join(f"{variables[name]}, " for name in symbols[fixed:])
+    source = (
+        f"def check_partition(prefix, product=product):\n"
+        f"{prefix}"
+        f"    for {names or '_'} in product((False, True), repeat={len(symbols) - fixed}):\n"
+        f"        if {knowledge.expression(variables)} and not {query.expression(variables)}:\n"
+        f"            return False\n"
+        f"    return True\n"
+    )
+    namespace = dict(product=itertools.product)
+    exec(source, namespace)
+    return namespace["check_partition"]
+
+
+# Partition check compiled once in each worker process of parallel_check
+_partition_check = None
+
+
+def _init_partition_worker(knowledge, query, symbols, fixed):
+    global _partition_check
+    _partition_check = compile_partition_check(knowledge, query, symbols, fixed)
+
+
+def _check_partition(prefix):
+    return _partition_check(prefix)
+
+
+def parallel_check(knowledge, query, processes=None, partitions_per_process=8):
+    """
+    Checks if knowledge base entails query by enumerating models in a
+    process pool. The model space is split by fixing the first k symbols,
+    giving each process about partitions_per_process partitions; as soon
+    as any partition holds a counter-model the pool is terminated.
+    """
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+    processes = processes or os.cpu_count() or 1
+    fixed = min(len(symbols), math.ceil(math.log2(processes * partitions_per_process)))
+    # Models are counted a whole partition at a time
+    partition = 2 ** (len(symbols) - fixed)
+    if processes == 1:
+        check = compile_partition_check(knowledge, query, symbols, fixed)
+        for prefix in range(2 ** fixed):
+            work_done["models"] += partition
+            if not check(prefix):
+                return False
+        return True
+
+    with multiprocessing.Pool(processes, _init_partition_worker,
+                              (knowledge, query, symbols, fixed)) as pool:
+        for entailed in pool.imap_unordered(_check_partition, range(2 ** fixed)):
+            work_done["models"] += partition
+            if not entailed:
+
+                # Leaving the with block terminates the other workers
+                return False
+    return True
+
+
+def entailed_literals(knowledge, symbols):
+    """
+    Enumerates the models of knowledge once and returns a dict mapping
+    each of symbols to True if knowledge entails it, False if knowledge
+    entails its negation and None if neither. If knowledge has no models
+    it entails everything, and every symbol maps to True.
+    """
+    knowledge = simplify(knowledge)
+    order = sorted(knowledge.symbols())
+    variables = {name: f"v{i}" for i, name in enumerate(order)}
+    names = "".join(f"{variables[name]}, " for name in order)
+    queried = [symbol for symbol in symbols if symbol.name in variables]
+    bits = " | ".join(
+        f"{variables[symbol.name]} << {i}" for i, symbol in enumerate(queried)
+    ) or "0"
+    full = 2 ** len(queried) - 1
+
+    # Bit i of always_true (always_false) stays set while every model
+    # seen so far makes the i-th queried symbol true (false)
+    source = (
+        f"def scan(product):\n"
+        f"    found = False\n"
+        f"    always_true = always_false = {full}\n"
+        f"    for {names or '_'} in product((False, True), repeat={len(order)}):\n"
+        f"        if {knowledge.expression(variables)}:\n"
+        f"            found = True\n"
+        f"            model = {bits}\n"
+        f"            always_true &= model\n"
+        f"            always_false &= ~model\n"
+        f"            if not always_true and not always_false:\n"
+        f"                break\n"
+        f"    return found, always_true, always_false\n"
+    )
+    namespace = dict()
+    exec(source, namespace)
+    found, always_true, always_false = namespace["scan"](itertools.product)
+
+    result = dict()
+    for symbol in symbols:
+        result[symbol] = True if not found else None
+    for i, symbol in enumerate(queried):
+        if not found or always_true >> i & 1:
+            result[symbol] = True
+        elif always_false >> i & 1:
+            result[symbol] = False
+    return result
+
+
+def numpy_check(knowledge, query, chunk_bits=22):
+    """
+    Checks if knowledge base entails query by evaluating both sentences
+    on whole truth table columns with NumPy, 2 ** chunk_bits models at
+    a time. Each model is one bit of a uint64 word: the first 6 symbols
+    vary within a word, the next ones from word to word of a chunk and
+    the rest from chunk to chunk.
+    """
+    if np is None:
+        raise ImportError("the numpy model checking method needs numpy")
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+    n = len(symbols)
+    ones = ~np.uint64(0)
+    zeros = np.uint64(0)
+
+    # Symbols that vary within a word
+    columns = dict()
+    for i, name in enumerate(symbols[:6]):
+        columns[name] = np.uint64(sum(1 << j for j in range(64) if j >> i & 1))
+
+    # Symbols that vary from word to word
+    word_bits = max(0, min(n, chunk_bits) - 6)
+    words = np.arange(2 ** word_bits, dtype=np.uint64)
+    for i, name in enumerate(symbols[6:6 + word_bits]):
+        columns[name] = np.where((words >> np.uint64(i)) & np.uint64(1), ones, zeros)
+
+    # Symbols that vary from chunk to chunk
+    outer = symbols[6 + word_bits:]
+    for chunk in range(2 ** len(outer)):
+        for i, name in enumerate(outer):
+            columns[name] = ones if chunk >> i & 1 else zeros
+        work_done["models"] += 2 ** (n - len(outer))
+        counter_models = knowledge.vectorize(columns) & ~query.vectorize(columns)
+        if np.any(counter_models):
+            return False
+    return True
+
+
+class BDD():
+    """
+    Reduced ordered binary decision diagrams sharing one unique table.
+
+    Nodes are integers: FALSE and TRUE are the terminals, any other node
+    n tests variable level[n] and continues to low[n] when it is false
+    and high[n] when it is true. Variables are ordered by level, given
+    by order or else in the order they are first compiled. Results of
+    the connectives are cached, so compiling, conditioning and counting
+    take time polynomial in the size of the diagrams.
+    """
+
+    FALSE = 0
+    TRUE = 1
+
+    def __init__(self, order=()):
+        self.names = []
+        self.levels = dict()
+
+        # Terminals sit below every variable
+        self.level = [math.inf, math.inf]
+        self.low = [None, None]
+        self.high = [None, None]
+        self.unique = dict()
+        self.cache = dict()
+        self.compiled = dict()
+        for name in order:
+            self.add_variable(name)
+
+    def add_variable(self, name):
+        if name not in self.levels:
+            self.levels[name] = len(self.names)
+            self.names.append(name)
+        return self.levels[name]
+
+    def node(self, level, low, high):
+        """Returns the unique node testing level, or low if both branches agree."""
+        if low == high:
+            return low
+        key = (level, low, high)
+        node = self.unique.get(key)
+        if node is None:
+            node = len(self.level)
+            self.level.append(level)
+            self.low.append(low)
+            self.high.append(high)
+            self.unique[key] = node
+        return node
+
+    def variable(self, name):
+        return self.node(self.add_variable(name), BDD.FALSE, BDD.TRUE)
+
+    def compile(self, sentence):
+        """Returns the node of sentence. Sentences other than a growing
+        And are compiled once."""
+        if sentence.mutable:
+            return sentence.bdd(self)
+        node = self.compiled.get(sentence)
+        if node is None:
+            node = sentence.bdd(self)
+            self.compiled[sentence] = node
+        return node
+
+    def apply(self, op, u, v):
+        """Combines u and v with op, one of "and", "or" and "xor"."""
+        if op == "and":
+            if u == BDD.FALSE or v == BDD.FALSE:
+                return BDD.FALSE
+            if u == BDD.TRUE or u == v:
+                return v
+            if v == BDD.TRUE:
+                return u
+        elif op == "or":
+            if u == BDD.TRUE or v == BDD.TRUE:
+                return BDD.TRUE
+            if u == BDD.FALSE or u == v:
+                return v
+            if v == BDD.FALSE:
+                return u
+        else:
+            if u == v:
+                return BDD.FALSE
+            if u == BDD.FALSE:
+                return v
+            if v == BDD.FALSE:
+                return u
+
+        # All three are commutative
+        if u > v:
+            u, v = v, u
+        key = (op, u, v)
+        result = self.cache.get(key)
+        if result is not None:
+            return result
+        level = min(self.level[u], self.level[v])
+        u_low, u_high = (self.low[u], self.high[u]) if self.level[u] == level else (u, u)
+        v_low, v_high = (self.low[v], self.high[v]) if self.level[v] == level else (v, v)
+        result = self.node(level, self.apply(op, u_low, v_low),
+                           self.apply(op, u_high, v_high))
+        self.cache[key] = result
+        return result
+
+    def conjoin(self, u, v):
+        return self.apply("and", u, v)
+
+    def disjoin(self, u, v):
+        return self.apply("or", u, v)
+
+    def xor(self, u, v):
+        return self.apply("xor", u, v)
+
+    def negate(self, u):
+        return self.apply("xor", u, BDD.TRUE)
+
+    def entails(self, u, v):
+        """Checks if every model of u is a model of v."""
+        return self.conjoin(u, self.negate(v)) == BDD.FALSE
+
+    def condition(self, u, evidence):
+        """Returns u with the variables named in evidence fixed to their values."""
+        fixed = {self.levels[name]: value for name, value in evidence.items()
+                 if name in self.levels}
+        memo = dict()
+
+        def restrict(u):
+            if u <= BDD.TRUE:
+                return u
+            if u in memo:
+                return memo[u]
+            level = self.level[u]
+            if level in fixed:
+                result = restrict(self.high[u] if fixed[level] else self.low[u])
+            else:
+                result = self.node(level, restrict(self.low[u]), restrict(self.high[u]))
+            memo[u] = result
+            return result
+
+        return restrict(u)
+
+    def count(self, u, symbols=None):
+        """
+        Returns the number of models of u over symbols (names), which
+        must include every variable u depends on; by default, over all
+        the variables of the manager.
+        """
+        n = len(self.names)
+        memo = {BDD.FALSE: 0, BDD.TRUE: 1}
+
+        # Models over the variables from the level of each node down
+        def level(u):
+            return n if u <= BDD.TRUE else self.level[u]
+
+        def models(u):
+            if u not in memo:
+                low, high = self.low[u], self.high[u]
+                memo[u] = (models(low) << (level(low) - level(u) - 1)) + \
+                          (models(high) << (level(high) - level(u) - 1))
+            return memo[u]
+
+        total = models(u) << level(u)
+        if symbols is None:
+            return total
+
+        # Symbols the manager has never seen are free, variables outside
+        # symbols must be ones u does not depend on
+        symbols = set(symbols)
+        extra = len(symbols.difference(self.levels))
+        unused = n - (len(symbols) - extra)
+        return total << extra >> unused
+
+    def size(self, u):
+        """Returns the number of internal nodes reachable from u."""
+        seen = set()
+        stack = [u]
+        while stack:
+            node = stack.pop()
+            if node > BDD.TRUE and node not in seen:
+                seen.add(node)
+                stack.extend((self.low[node], self.high[node]))
+        return len(seen)
+
+
+def bdd_check(knowledge, query):
+    """Checks if knowledge base entails query by compiling both to BDDs,
+    ordering the symbols most frequently occurring first."""
+    manager = BDD(symbol_order(knowledge, query))
+    entailed = manager.entails(manager.compile(knowledge), manager.compile(query))
+    work_done["BDD nodes"] += len(manager.level) - 2
+    return entailed
+
+
+class KnowledgeBase():
+    """
+    Knowledge base that remembers the answers to its queries.
+
+    Adding a sentence only ever removes models, so answers that were
+    entailed stay entailed and only the others are forgotten. The models
+    of the knowledge base are enumerated once, on the first query, and
+    later queries are checked against that list alone; add() filters the
+    list with the new sentence instead of enumerating again. With more
+    than max_symbols symbols or model_limit models, queries go to
+    model_check instead, without enumerating again until add() may have
+    removed enough models.
+    """
+
+    def __init__(self, *sentences, method="enumerate", max_symbols=20, model_limit=2 ** 16):
+        self.sentence = And(*sentences)
+        self.method = method
+        self.max_symbols = max_symbols
+        self.model_limit = model_limit
+        self.answers = dict()
+
+        # Models as integers, bit i being the value of self.order[i]
+        self.order = []
+        self.models = None
+        self.too_many_models = False
+
+    def add(self, sentence):
+        self.sentence.add(sentence)
+        self.too_many_models = False
+        self.answers = {query: True for query, answer in self.answers.items() if answer}
+        if self.models is None:
+            return
+
+        # Extend the models with any new symbols, keep those satisfying sentence
+        new = sorted(sentence.symbol_set().difference(self.order))
+        if len(self.models) << len(new) > self.model_limit:
+            self.models = None
+            return
+        base = len(self.order)
+        self.order.extend(new)
+        check, _ = compile_sentence(sentence, self.order)
+        self.models = [model | extra << base
+                       for model in self.models
+                       for extra in range(2 ** len(new))
+                       if check(model | extra << base)]
+
+    def enumerate_models(self):
+        """Lists the models of the knowledge base, unless there are too many."""
+        self.order = sorted(self.sentence.symbol_set())
+        check, _ = compile_sentence(self.sentence, self.order)
+        models = []
+        for model in range(2 ** len(self.order)):
+            if check(model):
+                models.append(model)
+                if len(models) > self.model_limit:
+                    return None
+        return models
+
+    def ask(self, query):
+        """Checks if the knowledge base entails query."""
+        if query in self.answers:
+            return self.answers[query]
+        if (self.models is None and not self.too_many_models
+                and len(self.sentence.symbol_set()) <= self.max_symbols):
+            self.models = self.enumerate_models()
+            self.too_many_models = self.models is None
+        if self.models is not None and query.symbol_set().issubset(self.order):
+            check, _ = compile_sentence(query, self.order)
+            answer = all(check(model) for model in self.models)
+        else:
+            answer = model_check(self.sentence, query, self.method)
+        self.answers[query] = answer
+        return answer
+
+
+# Tokens of formula text: operators (with ASCII spellings), parentheses
+# and symbol names, which run up to the next operator or parenthesis
+TOKEN = re.compile(r"\s*(<=>|=>|[¬~∧&∨|(),]|[^¬~∧&∨|(),<=]+)")
+CARDINALITY = re.compile(r"ExactlyOne|AtMost(\d+)|AtLeast(\d+)")
+OPERATORS = {"~": "¬", "&": "∧", "|": "∨"}
+
+
+def parse(text):
+    """
+    Parses a formula as written by Sentence.formula() back into a
+    sentence. Binding is tightest for ¬ (or ~), then ∧ (&), ∨ (|),
+    => and <=>; chains of ∧ and ∨ become a single And or Or.
+    ExactlyOne(...), AtMostK(...) and AtLeastK(...) with K a number
+    are read as cardinality sentences, and ⊤ and ⊥ as the empty And
+    and Or that stand for true and false.
+    """
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = TOKEN.match(text, position)
+        if match is None:
+            raise ValueError(f"unexpected {text[position:]!r}")
+        token = match.group(1).strip()
+        tokens.append(OPERATORS.get(token, token))
+        position = match.end()
+    tokens.append(None)
+    position = 0
+
+    def peek():
+        return tokens[position]
+
+    def take(expected=None):
+        nonlocal position
+        token = tokens[position]
+        if expected is not None and token != expected:
+            raise ValueError(f"expected {expected!r}, found {token!r}")
+        position += 1
+        return token
+
+    def biconditional():
+        left = implication()
+        while peek() == "<=>":
+            take()
+            left = Biconditional(left, implication())
+        return left
+
+    def implication():
+        antecedent = disjunction()
+        if peek() == "=>":
+            take()
+            return Implication(antecedent, implication())
+        return antecedent
+
+    def disjunction():
+        disjuncts = [conjunction()]
+        while peek() == "∨":
+            take()
+            disjuncts.append(conjunction())
+        return disjuncts[0] if len(disjuncts) == 1 else Or(*disjuncts)
+
+    def conjunction():
+        conjuncts = [negation()]
+        while peek() == "∧":
+            take()
+            conjuncts.append(negation())
+        return conjuncts[0] if len(conjuncts) == 1 else And(*conjuncts)
+
+    def negation():
+        token = take()
+        if token == "¬":
+            return Not(negation())
+        if token == "(":
+            sentence = biconditional()
+            take(")")
+            return sentence
+        if token is None or token in ("∧", "∨", "=>", "<=>", ")", ","):
+            raise ValueError(f"unexpected {token!r}")
+        if token == "⊤":
+            return And()
+        if token == "⊥":
+            return Or()
+        match = CARDINALITY.fullmatch(token)
+        if match and peek() == "(":
+            take()
+            operands = []
+            while peek() != ")":
+                if operands:
+                    take(",")
+                operands.append(biconditional())
+            take()
+            if match.group(1) is not None:
+                return AtMostK(int(match.group(1)), *operands)
+            if match.group(2) is not None:
+                return AtLeastK(int(match.group(2)), *operands)
+            return ExactlyOne(*operands)
+        return Symbol(token)
+
+    sentence = biconditional()
+    take(None)
+    return sentence
+
+
+def sentence_types():
+    """Returns every Sentence subclass by name."""
+    types = dict()
+    stack = [Sentence]
+    while stack:
+        cls = stack.pop()
+        types[cls.__name__] = cls
+        stack.extend(cls.__subclasses__())
+    return types
+
+
+def dumps(sentence):
+    """
+    Serializes sentence to compact JSON. Each distinct subformula is
+    written once, as [class name, arguments...] where an integer refers
+    to an earlier node and other arguments are wrapped in a list.
+    """
+    nodes = []
+    numbers = dict()
+    stack = [(sentence, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if node in numbers:
+            continue
+        arguments = node.arguments()
+        if not expanded:
+            stack.append((node, True))
+            stack.extend((argument, False) for argument in reversed(arguments)
+                         if isinstance(argument, Sentence))
+            continue
+        numbers[node] = len(nodes)
+        nodes.append([type(node).__name__] + [
+            numbers[argument] if isinstance(argument, Sentence) else [argument]
+            for argument in arguments
+        ])
+    return json.dumps(nodes, ensure_ascii=False, separators=(",", ":"))
+
+
+def loads(text):
+    """Rebuilds the sentence serialized by dumps."""
+    types = sentence_types()
+    sentences = []
+    for node in json.loads(text):
+        arguments = [sentences[argument] if isinstance(argument, int) else argument[0]
+                     for argument in node[1:]]
+        sentences.append(types[node[0]](*arguments))
+    return sentences[-1]
+
+
+def save(sentence, path):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(dumps(sentence))
+
+
+def load(path):
+    with open(path, encoding="utf-8") as f:
+        return loads(f.read())
+
+
+def cached(path, build):
+    """Loads the sentence saved at path, or calls build() and saves it there."""
+    if os.path.exists(path):
+        return load(path)
+    sentence = build()
+    save(sentence, path)
+    return sentence
+
+
+METHODS = {
+    "dpll": dpll_check,
+    "compiled": compiled_check,
+    "numpy": numpy_check,
+    "resolution": resolution_check,
+    "parallel": parallel_check,
+    "prune": pruning_check,
+    "bdd": bdd_check,
+    "gray": gray_check
+}
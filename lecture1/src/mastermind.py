@@ -8,32 +8,13 @@ for i in range(4):
 
 knowledge = And()
 
-# Each color has a position.
+# Each color has exactly one position.
 for color in colors:
-    knowledge.add(Or(
-        Symbol(f"{color}0"),
-        Symbol(f"{color}1"),
-        Symbol(f"{color}2"),
-        Symbol(f"{color}3")
-    ))
-
-# Only one position per color.
-for color in colors:
-    for i in range(4):
-        for j in range(4):
-            if i != j:
-                knowledge.add(Implication(
-                    Symbol(f"{color}{i}"), Not(Symbol(f"{color}{j}"))
-                ))
+    knowledge.add(ExactlyOne(*[Symbol(f"{color}{i}") for i in range(4)]))
 
 # Only one color per position.
 for i in range(4):
-    for c1 in colors:
-        for c2 in colors:
-            if c1 != c2:
-                knowledge.add(Implication(
-                    Symbol(f"{c1}{i}"), Not(Symbol(f"{c2}{i}"))
-                ))
+    knowledge.add(AtMostK(1, *[Symbol(f"{color}{i}") for color in colors]))
 
 knowledge.add(Or(
     And(Symbol("red0"), Symbol("blue1"), Not(Symbol("green2")), Not(Symbol("yellow3"))),
@@ -51,6 +32,10 @@ knowledge.add(And(
     Not(Symbol("yellow3"))
 ))
 
-for symbol in symbols:
-    if model_check(knowledge, symbol):
+for symbol, value in entailed_literals(knowledge, symbols).items():
+    if value:
         print(symbol)
+
+manager = BDD()
+solutions = manager.count(manager.compile(knowledge), [symbol.name for symbol in symbols])
+print(f"{solutions} solution(s) remain")
@@ -0,0 +1,116 @@
+"""
+Generators for bigger versions of the lecture puzzles
+
+Each generator returns (knowledge, symbols): the knowledge base and
+the symbols worth asking about. Puzzles are built around a hidden
+solution drawn with random.Random(seed), so they always have one.
+"""
+
+import random
+
+from logic import *
+
+
+def mastermind(n=4, guesses=None, seed=0):
+    """
+    Mastermind with n colors in n positions, each color used once.
+    Every guess is a random arrangement, answered with how many of its
+    colors are in the right position.
+    """
+    rng = random.Random(seed)
+    colors = [f"color{c}" for c in range(n)]
+    symbols = [Symbol(f"{color}_{i}") for color in colors for i in range(n)]
+    knowledge = And()
+
+    # Each color has exactly one position, each position one color.
+    for color in colors:
+        knowledge.add(ExactlyOne(*[Symbol(f"{color}_{i}") for i in range(n)]))
+    for i in range(n):
+        knowledge.add(AtMostK(1, *[Symbol(f"{color}_{i}") for color in colors]))
+
+    secret = colors[:]
+    rng.shuffle(secret)
+    for _ in range(n if guesses is None else guesses):
+        guess = colors[:]
+        rng.shuffle(guess)
+        correct = sum(a == b for a, b in zip(guess, secret))
+        placed = [Symbol(f"{color}_{i}") for i, color in enumerate(guess)]
+        knowledge.add(cardinality(correct, correct, placed))
+    return knowledge, symbols
+
+
+def clue(cards=3, revealed=None, seed=0):
+    """
+    Clue with cards characters, rooms and weapons. One of each is the
+    solution; revealed cards (half of the others by default) are known
+    not to be, and every third hidden card shows up in a guess that
+    some player could disprove.
+    """
+    rng = random.Random(seed)
+    categories = [[Symbol(f"{kind}{i}") for i in range(cards)]
+                  for kind in ("character", "room", "weapon")]
+    symbols = [symbol for category in categories for symbol in category]
+
+    # There must have been a person, room, and weapon.
+    knowledge = And(*[Or(*category) for category in categories])
+
+    solution = [rng.choice(category) for category in categories]
+    others = [symbol for symbol in symbols if symbol not in solution]
+    rng.shuffle(others)
+    if revealed is None:
+        revealed = len(others) // 2
+    for symbol in others[:revealed]:
+        knowledge.add(Not(symbol))
+
+    # Someone holds at least one card of each of these guesses
+    for symbol in others[revealed::3]:
+        guess = [symbol if symbol in category else rng.choice(category)
+                 for category in categories]
+        knowledge.add(Or(*[Not(card) for card in guess]))
+    return knowledge, symbols
+
+
+def knights(n=3, seed=0):
+    """
+    Knights and knaves with n speakers. Each one makes a statement about
+    the others, true if the speaker is a knight and false if a knave.
+    """
+    rng = random.Random(seed)
+    knight = [Symbol(f"{chr(65 + i) if n <= 26 else i} is a Knight") for i in range(n)]
+    knave = [Symbol(f"{chr(65 + i) if n <= 26 else i} is a Knave") for i in range(n)]
+    symbols = [symbol for pair in zip(knight, knave) for symbol in pair]
+    is_knight = [rng.random() < 0.5 for _ in range(n)]
+
+    knowledge = And()
+    for i in range(n):
+        knowledge.add(ExactlyOne(knight[i], knave[i]))
+
+    for i in range(n):
+        others = [p for p in range(n) if p != i] or [i]
+        j, k = rng.choice(others), rng.choice(others)
+        kind = rng.randrange(3)
+        if kind == 0:
+            # "j is a knave."
+            statement, true = knave[j], not is_knight[j]
+        elif kind == 1:
+            # "j and k are the same kind."
+            statement = Biconditional(knight[j], knight[k])
+            true = is_knight[j] == is_knight[k]
+        else:
+            # "At least one of j, k and I is a knave."
+            statement = Or(knave[i], knave[j], knave[k])
+            true = not (is_knight[i] and is_knight[j] and is_knight[k])
+
+        # Knights only say true things and knaves only false ones
+        if true != is_knight[i]:
+            statement = Not(statement)
+        knowledge.add(Implication(knight[i], statement))
+        knowledge.add(Implication(knave[i], Not(statement)))
+    return knowledge, symbols
+
+
+GENERATORS = {
+    "mastermind": mastermind,
+    "clue": clue,
+    "knights": knights
+}